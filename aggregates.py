@@ -0,0 +1,227 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from storage import (CSV_PATH, MULTI_SELECT_FIELDS, PARQUET_ROOT, SCORE_FIELDS, SQLITE_PATH,
+                     split_multi_select, storage_backend, storage_location)
+
+# Running dashboard aggregates. Each refresh() only reads the responses stored
+# since the previous one (tracked by byte offset, row id or file name), so the
+# cost of a dashboard rerun does not grow with the size of the history. A
+# tail's position can be saved with state() and picked up again by a later
+# process with restore().
+
+COUNTED_FIELDS = ("lang", "country", "info_source", "gender", "age", "enjoyed") + SCORE_FIELDS + MULTI_SELECT_FIELDS
+
+
+class CSVTail:
+    def __init__(self, path=CSV_PATH):
+        self.path = path
+        self.offset = 0
+        self.fieldnames = None
+
+    def read_new(self):
+        if not os.path.isfile(self.path):
+            return
+        if os.path.getsize(self.path) < self.offset:
+            raise ResetNeeded
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            record = b""
+            for line in f:
+                record += line
+                # A quoted field may contain newlines; the record is only
+                # complete once its quotes balance and the line is terminated.
+                if record.count(b'"') % 2 or not record.endswith(b"\n"):
+                    continue
+                values = next(csv.reader([record.decode("utf-8")]), None)
+                self.offset += len(record)
+                record = b""
+                if not values:
+                    continue
+                if self.fieldnames is None:
+                    self.fieldnames = values
+                    continue
+                yield dict(zip(self.fieldnames, values))
+
+    def state(self):
+        return {"offset": self.offset, "fieldnames": self.fieldnames}
+
+    def restore(self, state):
+        self.offset = state["offset"]
+        self.fieldnames = state["fieldnames"]
+
+
+# Follows a site's daily CSV shards, including days added later.
+class CSVShardTail:
+    def __init__(self, root):
+        self.root = root
+        self.tails = {}
+
+    def read_new(self):
+        from csv_writer import shard_files
+
+        for path in shard_files(self.root):
+            tail = self.tails.setdefault(path, CSVTail(path))
+            yield from tail.read_new()
+
+    def state(self):
+        return {path: tail.state() for path, tail in self.tails.items()}
+
+    def restore(self, state):
+        for path, tail_state in state.items():
+            self.tails[path] = CSVTail(path)
+            self.tails[path].restore(tail_state)
+
+
+class SQLiteTail:
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.last_id = 0
+
+    def read_new(self):
+        if not os.path.isfile(self.path):
+            return
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("SELECT * FROM responses WHERE id > ? ORDER BY id", (self.last_id,)).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self.last_id = row["id"]
+            yield dict(row)
+
+    def state(self):
+        return {"last_id": self.last_id}
+
+    def restore(self, state):
+        self.last_id = state["last_id"]
+
+
+# Follows the date=YYYY-MM-DD partitions with a high-water mark each: the
+# newest part name read, plus the names read within SETTLE seconds before it
+# (a writer in another process may rename a part into place a little late).
+# A partition is only listed again once its directory changes, so a refresh
+# stats the partitions but does not list or compare every part ever written.
+class ParquetTail:
+    SETTLE = 60
+    # Directory times are coarse; one this recent may still change unseen.
+    FRESH_NS = 2_000_000_000
+
+    def __init__(self, root=PARQUET_ROOT):
+        self.root = root
+        self.partitions = {}
+
+    @classmethod
+    def _cutoff(cls, high):
+        # part-YYYYmmddTHHMMSS-xxxxxxxx.parquet, see parquet_store.write_partitions.
+        try:
+            stamp = datetime.strptime(high[5:20], "%Y%m%dT%H%M%S")
+        except ValueError:
+            return ""
+        return f"part-{stamp - timedelta(seconds=cls.SETTLE):%Y%m%dT%H%M%S}"
+
+    def read_new(self):
+        if not os.path.isdir(self.root):
+            return
+        import pyarrow.parquet as pq
+
+        for entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            mtime = entry.stat().st_mtime_ns
+            mark = self.partitions.setdefault(entry.name, {"mtime": None, "high": "", "recent": []})
+            if mark["mtime"] == mtime:
+                continue
+            recent = set(mark["recent"])
+            date = entry.name.partition("date=")[2]
+            for name in sorted(os.listdir(entry.path)):
+                if not name.endswith(".parquet") or name < self._cutoff(mark["high"]) or name in recent:
+                    continue
+                # Only marked as read once read, so a part that cannot be
+                # read yet is tried again on the next refresh.
+                rows = pq.read_table(os.path.join(entry.path, name)).to_pylist()
+                recent.add(name)
+                mark["high"] = max(mark["high"], name)
+                cutoff = self._cutoff(mark["high"])
+                mark["recent"] = sorted(part for part in recent if part >= cutoff)
+                for row in rows:
+                    row["date"] = date
+                    yield row
+            mark["mtime"] = mtime if time.time_ns() - mtime > self.FRESH_NS else None
+
+    def state(self):
+        return {"partitions": self.partitions}
+
+    def restore(self, state):
+        if "partitions" in state:
+            self.partitions = {name: dict(mark) for name, mark in state["partitions"].items()}
+            return
+        # Older state: every part path read.
+        self.partitions = {}
+        for path in state["seen"]:
+            directory, name = os.path.split(path)
+            mark = self.partitions.setdefault(os.path.basename(directory), {"mtime": None, "high": "", "recent": []})
+            mark["high"] = max(mark["high"], name)
+            mark["recent"].append(name)
+        for mark in self.partitions.values():
+            cutoff = self._cutoff(mark["high"])
+            mark["recent"] = sorted(name for name in mark["recent"] if name >= cutoff)
+
+
+class ResetNeeded(Exception):
+    pass
+
+
+def open_tail(backend=None, site=None):
+    backend = backend or storage_backend()
+    location = storage_location(backend, site)
+    if backend == "sqlite":
+        return SQLiteTail(location)
+    if backend == "parquet":
+        return ParquetTail(location)
+    return CSVShardTail(location) if site else CSVTail(location)
+
+
+class RunningAggregates:
+    def __init__(self, tail_factory=open_tail):
+        self.tail_factory = tail_factory
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.tail = self.tail_factory()
+        self.total = 0
+        self.counts = {field: Counter() for field in COUNTED_FIELDS}
+        self.daily = Counter()
+
+    def add(self, row):
+        self.total += 1
+        self.daily[row.get("date")] += 1
+        for field in COUNTED_FIELDS:
+            value = row.get(field)
+            if field in MULTI_SELECT_FIELDS:
+                self.counts[field].update(split_multi_select(value))
+            elif value not in (None, ""):
+                self.counts[field][str(value)] += 1
+
+    def refresh(self):
+        with self.lock:
+            try:
+                return self._consume()
+            except ResetNeeded:
+                # The file was replaced or truncated: start over from scratch.
+                self.reset()
+                return self._consume()
+
+    def _consume(self):
+        added = 0
+        for row in self.tail.read_new():
+            self.add(row)
+            added += 1
+        return added
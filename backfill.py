@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from aggregates import CSVTail, open_tail
+from questions import to_codes
+from storage import CSV_PATH, MULTI_SELECT_FIELDS, VISITOR_FIELDS, split_multi_select
+
+# Posts responses stored by the older kiosks (visitor_data.csv, or any
+# backend or site shard) to a form variant's Google Form, the way Trial.py's
+# submit_to_google_form would have. Rows go through the compiled form's
+# payload builder, so they map onto the same English/Norsk field ids, and are
+# posted by a bounded pool of threads sharing one pooled FormClient session.
+#
+# Progress is checkpointed: every row below `done` has been posted (or has
+# failed and is listed under `failed`), so an interrupted run resumes where it
+# stopped and --retry-failed resends only the failures. A row posted just
+# before a crash, but not yet checkpointed, is posted again on resume.
+#
+#     python backfill.py visitor_data.csv --variant trial
+#     FORM_ENDPOINT_OVERRIDE=http://127.0.0.1:8000/formResponse python backfill.py ...
+
+CONCURRENCY = 8
+CHECKPOINT_INTERVAL = 1.0
+ANSWER_FIELDS = tuple(field for field in VISITOR_FIELDS if field not in ("date", "time", "lang"))
+
+
+def checkpoint_path(variant, site=None):
+    return f"form_backfill_{variant}{'_' + site if site else ''}.json"
+
+
+class Checkpoint:
+    def __init__(self, path, source, variant):
+        self.path = path
+        self.source = source
+        self.variant = variant
+        self.done = 0
+        self.failed = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if (state["source"], state["variant"]) != (source, variant):
+                raise ValueError(f"{path} belongs to a backfill of {state['source']} to {state['variant']}")
+            self.done = state["done"]
+            self.failed = {int(number): error for number, error in state["failed"].items()}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "variant": self.variant, "done": self.done,
+                       "failed": {str(number): error for number, error in sorted(self.failed.items())}}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+# The answers of a stored row as form.render() returns them. Rows stored by
+# besøk.py before option codes hold its localized labels; those are mapped
+# back to codes, so the form receives the labels it was built with.
+def answers(row):
+    result = {}
+    for field in ANSWER_FIELDS:
+        value = row.get(field)
+        result[field] = split_multi_select(value) if field in MULTI_SELECT_FIELDS else (value or None)
+    return to_codes(result)
+
+
+class BackfillResult:
+    def __init__(self):
+        self.sent = self.failed = self.skipped = 0
+        self.elapsed = 0.0
+
+
+# `rows` are stored rows in a stable order (row numbers are checkpointed);
+# `post(url, data)` returns None or an error, like FormClient.post.
+def backfill(rows, form, post, checkpoint, concurrency=CONCURRENCY, retry_failed=False, limit=None):
+    result = BackfillResult()
+    start = time.perf_counter()
+    retry = set(checkpoint.failed) if retry_failed else None
+    completed = set()
+    last_save = time.monotonic()
+
+    def send(number, row):
+        lang = row.get("lang") or form.languages[0]
+        if lang not in form.languages:
+            return number, f"unknown language {lang!r}"
+        url, data = form.payload(answers(row), lang)
+        try:
+            return number, post(url, data)
+        except Exception as e:
+            return number, repr(e)
+
+    def finished(futures):
+        nonlocal last_save
+        for future in futures:
+            number, error = future.result()
+            if error is None:
+                result.sent += 1
+                checkpoint.failed.pop(number, None)
+            else:
+                result.failed += 1
+                checkpoint.failed[number] = error
+            if retry is None:
+                completed.add(number)
+        # Only a contiguous run of finished rows moves the resume point.
+        while checkpoint.done in completed:
+            completed.remove(checkpoint.done)
+            checkpoint.done += 1
+        if time.monotonic() - last_save >= CHECKPOINT_INTERVAL:
+            checkpoint.save()
+            last_save = time.monotonic()
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="form-backfill") as pool:
+        in_flight = set()
+        submitted = 0
+        for number, row in enumerate(rows):
+            skip = number not in retry if retry is not None else number < checkpoint.done
+            if skip:
+                result.skipped += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+            if len(in_flight) >= 2 * concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                finished(done)
+            in_flight.add(pool.submit(send, number, row))
+            submitted += 1
+        finished(wait(in_flight).done)
+    checkpoint.save()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post stored responses to a form variant's Google Form")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--variant", default="trial", help="form_schema.json variant whose Google Form to post to")
+    parser.add_argument("--storage", choices=("csv", "parquet", "sqlite"), help="read this backend instead of csv_path")
+    parser.add_argument("--site", help="read this site's shard and post to its forms")
+    parser.add_argument("--checkpoint", help="progress file (default form_backfill_<variant>[_<site>].json)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--retry-failed", action="store_true", help="resend only the rows that failed before")
+    parser.add_argument("--limit", type=int, help="stop after this many posts")
+    parser.add_argument("--endpoint", help="post everything here instead, e.g. a local stub")
+    args = parser.parse_args()
+
+    from form_http import FormClient
+    from form_schema import compiled_form
+
+    form = compiled_form(args.variant, args.site)
+    if not form.google_form:
+        parser.error(f"variant {args.variant!r} has no Google Form")
+    if args.storage or args.site:
+        backend = args.storage or "csv"
+        source, tail = f"{backend}:{args.site or ''}", open_tail(backend, args.site)
+    else:
+        source, tail = os.path.abspath(args.csv_path), CSVTail(args.csv_path)
+    checkpoint = Checkpoint(args.checkpoint or checkpoint_path(args.variant, args.site), source, args.variant)
+    client = FormClient(ok_statuses=form.ok_statuses, pool_size=args.concurrency, endpoint_override=args.endpoint)
+    try:
+        result = backfill(tail.read_new(), form, client.post, checkpoint, args.concurrency, args.retry_failed,
+                          args.limit)
+    finally:
+        client.close()
+
+    rate = (result.sent + result.failed) / result.elapsed if result.elapsed else 0.0
+    print(f"Posted {result.sent}, failed {result.failed}, skipped {result.skipped} already done "
+          f"in {result.elapsed:.1f}s ({rate:.1f} rows/s); resume point is row {checkpoint.done}")
+    if checkpoint.failed:
+        print(f"{len(checkpoint.failed)} rows recorded as failed in {checkpoint.path} (resend with --retry-failed):")
+        by_error = Counter(checkpoint.failed.values())
+        for error, n in by_error.most_common(10):
+            rows = [number for number, e in sorted(checkpoint.failed.items()) if e == error][:5]
+            print(f"  {n:6d}  {error}  (rows {', '.join(map(str, rows))}{', ...' if n > len(rows) else ''})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
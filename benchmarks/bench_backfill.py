@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import backfill
+import synthetic
+from aggregates import CSVTail
+from form_http import FormClient
+from form_schema import compiled_form
+from form_stub import FormStub
+
+# Backfill throughput against a local form stub that answers after `latency`
+# seconds: one post at a time against the bounded pool, the second run
+# resuming from the first one's checkpoint. Then a run against a stub that
+# rejects everything, and --retry-failed once it accepts again, to check that
+# every row reaches the form exactly once.
+
+
+def run(csv_path, checkpoint_path, stub, concurrency, retry_failed=False, limit=None):
+    form = compiled_form("trial")
+    client = FormClient(ok_statuses=form.ok_statuses, pool_size=concurrency, retries=0,
+                        endpoint_override=stub.url)
+    checkpoint = backfill.Checkpoint(checkpoint_path, csv_path, "trial")
+    try:
+        return backfill.backfill(CSVTail(csv_path).read_new(), form, client.post, checkpoint, concurrency,
+                                 retry_failed, limit), checkpoint
+    finally:
+        client.close()
+
+
+# A row stored with besøk.py's localized labels must post exactly what a live
+# Trial.py submission of the same answers posts.
+def check_legacy_rows(rows=200):
+    from csv_writer import to_csv_row
+    from storage import MULTI_SELECT_FIELDS, split_multi_select
+
+    form = compiled_form("trial")
+    besok = compiled_form("besok")
+    for row in synthetic.synthetic_rows(rows, seed=1):
+        lang = row["lang"]
+        # What form.render() returns for these answers.
+        live = {field: split_multi_select(row[field]) if field in MULTI_SELECT_FIELDS else (row[field] or None)
+                for field in backfill.ANSWER_FIELDS}
+        legacy = dict(live)
+        for question in besok.questions(lang):
+            if question.type == "multi":
+                legacy[question.id] = [question.format(code) for code in live[question.id]]
+            elif question.type == "choice" and live[question.id]:
+                legacy[question.id] = question.format(live[question.id])
+        legacy = to_csv_row({**row, **legacy})
+        assert form.payload(backfill.answers(legacy), lang) == form.payload(live, lang), legacy
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Google Form backfill against a local stub")
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=backfill.CONCURRENCY)
+    args = parser.parse_args()
+
+    print(f"legacy label rows post the same payload as live submissions ({check_legacy_rows()} checked)")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "visitor_data.csv")
+        synthetic.write_csv(csv_path, args.rows)
+        checkpoint_path = os.path.join(tmp, "checkpoint.json")
+        serial = max(1, args.rows // 20)
+        with FormStub(delay=args.latency) as stub:
+            first, _ = run(csv_path, checkpoint_path, stub, 1, limit=serial)
+            second, checkpoint = run(csv_path, checkpoint_path, stub, args.concurrency)
+            posts = stub.count()
+        print(f"1 at a time     {first.sent / first.elapsed:8.1f} rows/s ({first.sent} rows)")
+        print(f"{args.concurrency} concurrent    {second.sent / second.elapsed:8.1f} rows/s ({second.sent} rows, "
+              f"{second.skipped} skipped from the checkpoint)")
+        print(f"stub received {posts} posts for {args.rows} rows; resume point {checkpoint.done}")
+
+        rejected_path = os.path.join(tmp, "rejected.json")
+        with FormStub(status=400) as stub:
+            failed, checkpoint = run(csv_path, rejected_path, stub, args.concurrency, limit=50)
+        with FormStub() as stub:
+            retried, checkpoint = run(csv_path, rejected_path, stub, args.concurrency, retry_failed=True)
+            posts = stub.count()
+        print(f"rejecting stub: {failed.failed} failed; --retry-failed resent {retried.sent} ({posts} posts), "
+              f"{len(checkpoint.failed)} still failed")
+
+
+if __name__ == "__main__":
+    main()
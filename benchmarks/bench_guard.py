@@ -0,0 +1,71 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+import submit_guard
+
+# Cost of the submit guard per call, and its memory after far more sessions
+# and submissions than its LRUs hold. Then a replay of kiosk traffic with
+# double taps and a spamming visitor mixed in, to show what gets rejected.
+
+
+def per_call(guard, calls):
+    answers = [dict(row) for row in synthetic.synthetic_rows(1000)]
+    start = time.perf_counter()
+    for i in range(calls):
+        # A new session every call, so nothing is rejected and every call
+        # takes the full path (fingerprint, two buckets, LRU insert).
+        guard.check(f"session-{i}", f"kiosk-{i % 8}", answers[i % len(answers)], "English", now=i * 10.0)
+    return (time.perf_counter() - start) / calls
+
+
+def memory(calls):
+    tracemalloc.start()
+    guard = submit_guard.SubmitGuard()
+    per_call(guard, 10_000)
+    settled = tracemalloc.get_traced_memory()[0]
+    per_call(guard, calls)
+    grown = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return settled, grown
+
+
+def replay(visitors, seed):
+    rng = random.Random(seed)
+    guard = submit_guard.SubmitGuard()
+    now = 0.0
+    for visitor, row in enumerate(synthetic.synthetic_rows(visitors, seed)):
+        now += rng.uniform(20, 90)
+        session = f"kiosk-{visitor % 4}"
+        guard.check(session, session, row, "English", now=now)
+        if rng.random() < 0.1:
+            guard.check(session, session, row, "English", now=now + rng.uniform(0.05, 0.5))
+        if rng.random() < 0.02:
+            for tap in range(20):
+                row = dict(row, improvement=f"spam {tap}")
+                guard.check(session, session, row, "English", now=now + tap * 0.3)
+    return guard.rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit guard cost and rejections")
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--visitors", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"check(): {per_call(submit_guard.SubmitGuard(), args.calls) * 1e6:.2f} µs per call")
+    settled, grown = memory(args.calls)
+    print(f"memory after 10k calls {settled / 1024:,.0f} KiB, after {args.calls:,} more {grown / 1024:,.0f} KiB")
+    print(f"replay of {args.visitors:,} visitors: rejected {replay(args.visitors, 7)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Peak RSS and throughput of the chunked report against a single full
+# pd.read_csv, each measured in a fresh subprocess on the same synthetic file.
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode, path, chunk_size):
+    import pandas as pd
+    import report
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "chunked":
+        rows = report.build_report(path, chunk_size).rows
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        summary = report.ChunkedReport()
+        summary.add_chunk(df)
+        rows = summary.rows
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"mode": mode, "rows": rows, "seconds": elapsed, "rows_per_s": rows / elapsed,
+                      "peak_rss_mb": peak_rss_mb(), "import_rss_mb": baseline}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked report benchmark on synthetic responses")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--mode", choices=("chunked", "full"), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.path, args.chunk_size)
+        return
+
+    import synthetic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "visitor_data.csv")
+        start = time.perf_counter()
+        synthetic.write_csv(path, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"generated {args.rows} rows ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+        for mode in ("chunked", "full"):
+            out = subprocess.run([sys.executable, __file__, "--mode", mode, "--path", path,
+                                  "--chunk-size", str(args.chunk_size)],
+                                 check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:<8} {result['rows_per_s']:>12,.0f} rows/s  {result['seconds']:7.2f}s  "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB (after imports {result['import_rss_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import base64
+import copy
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import resources
+
+# Compares the static-data work each Streamlit rerun used to repeat against the
+# cached resource layer, then times full reruns of every entry point.
+
+ENTRY_POINTS = ["besøk.py", "besøkende.py", "Trial.py", "Trial1.py"]
+
+
+def legacy_startup(logo_path, translations):
+    import pycountry
+    from PIL import Image
+
+    with open(logo_path, "rb") as img_file:
+        base64.b64encode(img_file.read()).decode()
+    try:
+        Image.open(logo_path)
+    except Exception:
+        pass
+    sorted([country.name for country in pycountry.countries])
+    copy.deepcopy(translations)
+
+
+def cached_startup(logo_path):
+    resources.load_logo_base64(logo_path)
+    resources.country_names()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, samples):
+    ms = sorted(s * 1000 for s in samples)
+    print(f"{label:<28} median {statistics.median(ms):8.3f} ms   p95 {ms[int(len(ms) * 0.95) - 1]:8.3f} ms")
+
+
+def bench_apps(repeat):
+    from streamlit.testing.v1 import AppTest
+
+    for script in ENTRY_POINTS:
+        at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=30)
+        at.run()
+        report(f"rerun {script}", timed(at.run, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun latency before/after the cached resource layer")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--skip-apps", action="store_true", help="only time the static-data work")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    logo_path = resources.LOGO_PATH
+    translations = {"English": {str(i): "x" * 60 for i in range(30)}, "Norsk": {str(i): "y" * 60 for i in range(30)}}
+
+    legacy_startup(logo_path, translations)
+    cached_startup(logo_path)
+    report("before: per-rerun load", timed(lambda: legacy_startup(logo_path, translations), args.repeat))
+    report("after: cached resources", timed(lambda: cached_startup(logo_path), args.repeat))
+
+    if not args.skip_apps:
+        bench_apps(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+import report
+import rollups
+from aggregates import CSVTail
+from csv_writer import append_csv
+from storage import VISITOR_FIELDS
+
+# Date-range report latency: the chunked report rescanning raw rows against
+# merging the daily/monthly rollups (first query, then from the in-memory
+# cache), over growing histories. Also the cost of folding one flush worth of
+# new rows into the rollups.
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def raw_report(path, start, end):
+    chunks = (chunk[(chunk["date"] >= start) & (chunk["date"] <= end)] for chunk in report.iter_chunks(path))
+    return report.ChunkedReport().consume(chunks)
+
+
+def rollup_report(store, start, end):
+    result = report.ChunkedReport()
+    for month, summary in sorted(store.monthly(start, end).items()):
+        result.add_summary(month, summary)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialized rollups against raw rescans")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000, 400_000])
+    parser.add_argument("--flush", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'raw s':>8} {'rollup ms':>10} {'cached ms':>10} {'flush ms':>9} {'in range':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "visitor_data.csv")
+            rows = list(synthetic.synthetic_rows(size + args.flush))
+            append_csv(path, rows[:size], VISITOR_FIELDS)
+            dates = sorted({row["date"] for row in rows})
+            start, end = dates[len(dates) // 3], dates[len(dates) // 3 + 100]
+
+            store = rollups.Rollups(os.path.join(tmp, "rollups.db"))
+            store.update(tail=CSVTail(path))
+            raw, expected = timed(lambda: raw_report(path, start, end))
+            cold, result = timed(lambda: rollup_report(store, start, end))
+            warm, _ = timed(lambda: rollup_report(store, start, end))
+            assert result.rows == expected.rows
+            append_csv(path, rows[size:], VISITOR_FIELDS)
+            flush, _ = timed(lambda: store.update(tail=CSVTail(path)))
+            store.close()
+            print(f"{size:>8} {raw:>8.2f} {cold * 1000:>10.1f} {warm * 1000:>10.1f} {flush * 1000:>9.1f} "
+                  f"{result.rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scoring
+from synthetic import COUNTRIES
+from questions import codes
+from storage import SCORE_FIELDS
+
+# The int8 scoring engine against the row-wise pandas apply it replaces, on
+# millions of stored-format (string) responses: parsing the three ratings,
+# then mean, CSAT and top-2-box overall and per country, age and language.
+# The engine's figures also include 2000-draw bootstrap intervals.
+
+
+def frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = np.array(["5", "4", "3", "2", "1", ""], dtype=object)
+    data = {field: scores[rng.choice(6, n, p=[0.25, 0.25, 0.15, 0.1, 0.1, 0.15])] for field in SCORE_FIELDS}
+    data["country"] = np.array(COUNTRIES, dtype=object)[rng.integers(len(COUNTRIES), size=n)]
+    data["age"] = np.array(codes("age") + [""], dtype=object)[rng.integers(len(codes("age")) + 1, size=n)]
+    data["lang"] = np.array(["English", "Norsk"], dtype=object)[rng.integers(2, size=n)]
+    return pd.DataFrame(data)
+
+
+def pandas_apply(df):
+    parsed = df[list(SCORE_FIELDS)].apply(lambda column: column.apply(lambda v: int(v) if v else None))
+    results = {}
+    for field in SCORE_FIELDS:
+        scores = parsed[field]
+        results[field] = (scores.mean(), scores.dropna().apply(lambda v: v >= 4).mean())
+        for segment in scoring.SEGMENTS:
+            results[field, segment] = scores.groupby(df[segment]).apply(
+                lambda s: pd.Series({"mean": s.mean(), "csat": s.dropna().apply(lambda v: v >= 4).mean()}))
+    return results
+
+
+def engine(df):
+    scores = scoring.Scores.from_frame(df)
+    results = {"summary": scores.summary()}
+    for field in SCORE_FIELDS:
+        for segment in scoring.SEGMENTS:
+            results[field, segment] = scores.by(segment, field)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized scoring against pandas apply")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 3_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'pandas apply s':>15} {'int8 engine s':>14} {'speed-up':>9}")
+    for n in args.rows:
+        df = frame(n)
+        start = time.perf_counter()
+        expected = pandas_apply(df)
+        baseline = time.perf_counter() - start
+        start = time.perf_counter()
+        result = engine(df)
+        vectorized = time.perf_counter() - start
+        summary = result["summary"].set_index("question")
+        for field in SCORE_FIELDS:
+            assert abs(summary.loc[field, "mean"] - expected[field][0]) < 1e-3
+            assert abs(summary.loc[field, "csat"] - expected[field][1]) < 1e-3
+        print(f"{n:>10,} {baseline:>15.2f} {vectorized:>14.2f} {baseline / vectorized:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
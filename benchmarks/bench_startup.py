@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start benchmark. Every sample is a fresh interpreter that imports
+# streamlit and runs one entry point headlessly with STARTUP_PROFILE=1, so the
+# numbers include everything a new server worker pays before the first form.
+# Exits non-zero when a median misses its target.
+
+ENTRY_POINTS = ["besøk.py", "besøkende.py", "Trial.py", "Trial1.py"]
+
+# Medians in milliseconds. Before imports were slimmed besøk.py measured
+# 1570 / 890 / 570 on the reference container; after, 1110 / 440 / 3.
+TARGETS = {
+    "cold_start_ms": 1500,   # process start -> first form rendered
+    "first_form_ms": 600,    # first script run, including the app's own imports
+    "app_import_ms": 50,     # top-level imports made by the entry script
+}
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+done = time.perf_counter()
+import profiling
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({
+    "framework_import_ms": (framework - start) * 1000,
+    "first_form_ms": (done - framework) * 1000,
+    "app_import_ms": sum(seconds for name, seconds in profiling.imports if not name.startswith("streamlit")) * 1000,
+    "imports": {name: round(seconds * 1000, 2) for name, seconds in profiling.imports},
+}))
+"""
+
+
+def sample(script, workdir):
+    env = dict(os.environ, STARTUP_PROFILE="1", PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, os.path.join(ROOT, script)], cwd=workdir, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["cold_start_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and time-to-first-form per entry point")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--apps", nargs="+", default=ENTRY_POINTS)
+    parser.add_argument("--verbose", action="store_true", help="print per-import timings of the last sample")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for script in args.apps:
+            samples = [sample(script, workdir) for _ in range(args.repeat)]
+            medians = {key: statistics.median(s[key] for s in samples)
+                       for key in ("cold_start_ms", "framework_import_ms", "first_form_ms", "app_import_ms")}
+            print(f"{script:<14} " + "  ".join(f"{key} {value:7.1f}" for key, value in medians.items()))
+            if args.verbose:
+                for name, ms in sorted(samples[-1]["imports"].items(), key=lambda item: -item[1]):
+                    print(f"    {ms:8.2f} ms  {name}")
+            for key, target in TARGETS.items():
+                if medians[key] > target:
+                    failures.append(f"{script}: {key} {medians[key]:.1f} ms > target {target} ms")
+    for failure in failures:
+        print("MISSED", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+import text_analytics
+from aggregates import CSVTail
+from csv_writer import append_csv
+from storage import VISITOR_FIELDS
+
+# Improvement-answer index throughput: a full build over growing synthetic
+# histories, then an incremental run over a fixed batch of new responses on
+# top of each. Build throughput should hold steady as the history grows and
+# the incremental run should cost about the same at every size.
+
+FRAGMENTS = {
+    "English": ["more seating", "longer tour", "bigger screens", "the video was too long", "more tasting samples",
+                "signs in more languages", "cheaper tickets", "a quieter cinema room", "better lighting in the hall",
+                "the guide spoke too fast", "more about salmon farming", "a map of the exhibition"],
+    "Norsk": ["flere sitteplasser", "bedre skilting", "mer smaksprøver", "lengre omvisning", "større skjermer",
+              "filmen var for lang", "billigere billetter", "mer om oppdrett", "roligere kinosal",
+              "guiden snakket for fort", "kart over utstillingen", "bedre lys i salen"],
+}
+FILLERS = {"English": ["please", "maybe", "really", "and", "also", "thanks"],
+           "Norsk": ["gjerne", "kanskje", "veldig", "og", "også", "takk"]}
+
+
+def answer(rng, lang):
+    parts = rng.sample(FRAGMENTS[lang], rng.randint(1, 3))
+    words = " and ".join(parts).split() if lang == "English" else " og ".join(parts).split()
+    for _ in range(rng.randint(0, 3)):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS[lang]))
+    if rng.random() < 0.3:
+        words.append(f"room{rng.randrange(1000)}")
+    return " ".join(words)
+
+
+def rows(n, seed):
+    rng = random.Random(seed)
+    for row in synthetic.synthetic_rows(n, seed):
+        row["improvement"] = answer(rng, row["lang"]) if rng.random() < 0.6 else ""
+        yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Improvement text index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000, 80_000])
+    parser.add_argument("--increment", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'build rows/s':>13} {'build s':>8} {'+' + str(args.increment) + ' rows s':>12} {'clusters':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "visitor_data.csv")
+            append_csv(csv_path, list(rows(size, 1)), VISITOR_FIELDS)
+            index = text_analytics.TextIndex(os.path.join(tmp, "index.db"))
+            start = time.perf_counter()
+            read, _ = index.consume(CSVTail(csv_path), "bench")
+            build = time.perf_counter() - start
+            append_csv(csv_path, list(rows(args.increment, 2)), VISITOR_FIELDS)
+            start = time.perf_counter()
+            index.consume(CSVTail(csv_path), "bench")
+            increment = time.perf_counter() - start
+            clusters = len(index.clusters(2, 1_000_000))
+            index.close()
+            print(f"{read:>8} {read / build:>13,.0f} {build:>8.2f} {increment:>12.3f} {clusters:>9}")
+
+
+if __name__ == "__main__":
+    main()
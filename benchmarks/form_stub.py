@@ -0,0 +1,48 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+# Local stand-in for a Google Forms formResponse endpoint. Records every post
+# and answers with a fixed status after an optional delay.
+
+
+class FormStub:
+    def __init__(self, status=200, delay=0.0, host="127.0.0.1", port=0):
+        self.status = status
+        self.delay = delay
+        self.posts = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if stub.delay:
+                    time.sleep(stub.delay)
+                with stub.lock:
+                    stub.posts.append((self.path, parse_qsl(body, keep_blank_values=True)))
+                self.send_response(stub.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}/formResponse"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self):
+        with self.lock:
+            return len(self.posts)
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from form_stub import FormStub
+
+# Drives N concurrent headless sessions of an entry point through Streamlit's
+# AppTest: each one fills in and submits visitor_form, waits for the in-app
+# reset and starts over. Reports rerun/submit latency percentiles, throughput
+# and memory per session, and compares against a saved baseline.
+
+BASELINE_PATH = os.path.join(HERE, "baseline_load.json")
+APPS = ["besøk.py", "Trial.py"]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ms = sorted(s * 1000 for s in samples)
+    pick = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]
+    return {"p50": round(statistics.median(ms), 2), "p95": round(pick(0.95), 2), "p99": round(pick(0.99), 2)}
+
+
+# Answers a fresh form at random. The improvement text carries `tag`, so no
+# two submissions of a run are the same (the submit guard drops repeats).
+def fill_form(at, rng, tag):
+    for selectbox in at.selectbox[1:]:
+        selectbox.select_index(rng.randrange(len(selectbox.options)))
+    for radio in at.radio:
+        radio.set_value(rng.choice(radio.options))
+    for checkbox in at.checkbox:
+        if rng.random() < 0.4:
+            checkbox.check()
+    if at.text_area:
+        at.text_area[0].input(f"{rng.choice(['Nothing', 'More seating please', 'Flere sitteplasser'])} ({tag})")
+
+
+def session_steps(script, submissions, seed, results):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(script, default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    results["first_run"].append(time.perf_counter() - start)
+    yield
+    for n in range(submissions):
+        # Choosing the language reruns the script, as in a browser.
+        start = time.perf_counter()
+        at.selectbox[0].select_index(rng.randrange(len(at.selectbox[0].options))).run()
+        results["rerun"].append(time.perf_counter() - start)
+        yield
+
+        # Widgets inside st.form only reach the script with the submit click;
+        # a rerun in between would drop them.
+        fill_form(at, rng, f"{seed}-{n}")
+        start = time.perf_counter()
+        at.button[0].click().run()
+        results["submit"].append(time.perf_counter() - start)
+        if at.exception or not at.session_state["form_submitted"]:
+            results["errors"].append(str([e.value for e in at.exception]))
+        yield
+
+        # Skip the thank-you countdown and let the fragment reset the form.
+        at.session_state["submitted_at"] = 0
+        start = time.perf_counter()
+        at.run()
+        results["rerun"].append(time.perf_counter() - start)
+        yield
+
+
+# AppTest patches process-wide state while a script runs, so the sessions of
+# one process are interleaved step by step rather than run in threads; pass
+# --processes to put parallel load on several interpreters.
+def drive(args):
+    app, sessions, submissions, seed, workdir, stub_url = args
+    os.makedirs(workdir, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, "logo.png"), workdir)
+    os.chdir(workdir)
+    os.environ["FORM_ENDPOINT_OVERRIDE"] = stub_url
+    import submit_guard
+
+    # Every AppTest session has the same session id and kiosk, so the guard's
+    # rate limits would turn the load into rejections; submissions are kept
+    # distinct instead, and duplicates still count as lost.
+    submit_guard.GUARD.session_limit = submit_guard.GUARD.kiosk_limit = (1e-6, 1_000_000)
+    results = {"first_run": [], "rerun": [], "submit": [], "errors": []}
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    live = [session_steps(os.path.join(ROOT, app), submissions, seed + i, results) for i in range(sessions)]
+    while live:
+        for steps in list(live):
+            if next(steps, StopIteration) is StopIteration:
+                live.remove(steps)
+    results["elapsed"] = time.perf_counter() - start
+    results["rss_delta"] = rss_mb() - rss_before
+    # Rows reach the storage with its next flush (or WAL compaction) and
+    # Trial.py's posts go out with the outbox worker; let both drain.
+    from aggregates import open_tail
+
+    tail = open_tail()
+    results["stored"] = 0
+    deadline = time.time() + 60
+    while results["stored"] < sessions * submissions and time.time() < deadline:
+        time.sleep(0.1)
+        results["stored"] += sum(1 for _ in tail.read_new())
+    if app.startswith("Trial"):
+        from outbox import Outbox
+
+        outbox = Outbox()
+        while outbox.size() and time.time() < deadline:
+            time.sleep(0.05)
+    return results
+
+
+def run(app, sessions, submissions, processes):
+    import multiprocessing
+
+    results = {"first_run": [], "rerun": [], "submit": [], "errors": []}
+    shares = [sessions // processes + (i < sessions % processes) for i in range(processes)]
+    with tempfile.TemporaryDirectory() as tmp, FormStub() as stub:
+        jobs = [(app, share, submissions, i * 1000, os.path.join(tmp, f"p{i}"), stub.url)
+                for i, share in enumerate(shares) if share]
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+            parts = pool.map(drive, jobs)
+        drained = time.perf_counter() - start
+        delivered = stub.count()
+    elapsed = max(part["elapsed"] for part in parts)
+    for part in parts:
+        for key in results:
+            results[key].extend(part[key])
+    expected = sessions * submissions
+    stored = sum(part["stored"] for part in parts)
+    return {
+        "app": app,
+        "sessions": sessions,
+        "processes": len(jobs),
+        "total_submissions": expected,
+        "first_run_ms": percentiles(results["first_run"]),
+        "rerun_ms": percentiles(results["rerun"]),
+        "submit_ms": percentiles(results["submit"]),
+        "submissions_per_s": round(expected / elapsed, 2),
+        "stored": stored,
+        "delivered": delivered if app.startswith("Trial") else None,
+        "delivered_per_s": round(delivered / drained, 2) if app.startswith("Trial") else None,
+        "memory_per_session_mb": round(sum(part["rss_delta"] for part in parts) / sessions, 2),
+        "errors": len(results["errors"]),
+    }
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    for app, result in current.items():
+        base = baseline.get("results", {}).get(app)
+        if not base:
+            continue
+        for metric in ("rerun_ms", "submit_ms"):
+            for q in ("p50", "p95"):
+                before, after = base[metric].get(q), result[metric].get(q)
+                if before and after and after > before * (1 + tolerance):
+                    regressions.append(f"{app} {metric} {q}: {before} -> {after} ms")
+        if result["submissions_per_s"] < base["submissions_per_s"] * (1 - tolerance):
+            regressions.append(f"{app} submissions/s: {base['submissions_per_s']} -> {result['submissions_per_s']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent kiosk session load test")
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--submissions", type=int, default=5, help="submissions per session")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    lost = []
+    for app in args.apps:
+        results[app] = run(app, args.sessions, args.submissions, args.processes)
+        print(json.dumps(results[app], ensure_ascii=False))
+        # Every submission must be stored, and posted by Trial.py, exactly once.
+        result = results[app]
+        for counted in ("stored", "delivered"):
+            if result[counted] is not None and result[counted] != result["total_submissions"]:
+                lost.append(f"{app} {counted} {result[counted]} of {result['total_submissions']} submissions")
+        if result["errors"]:
+            lost.append(f"{app} {result['errors']} submissions failed")
+    for line in lost:
+        print("LOST", line)
+    if lost:
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "sessions": args.sessions, "submissions": args.submissions,
+                       "processes": args.processes, "results": results},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Saved baseline to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        # Latencies and throughput depend on the load, so only like runs compare.
+        params = {key: getattr(args, key) for key in ("sessions", "submissions", "processes")}
+        recorded = {key: baseline.get(key) for key in params}
+        if recorded != params:
+            print(f"Not comparing with {os.path.basename(BASELINE_PATH)}: recorded with {recorded}, this run {params}")
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
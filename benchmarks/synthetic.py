@@ -0,0 +1,41 @@
+import csv
+import random
+from datetime import date, timedelta
+
+from questions import OPTIONS
+from storage import MULTI_SELECT_FIELDS, MULTI_SELECT_SEPARATOR, SCORE_FIELDS, VISITOR_FIELDS
+
+# Synthetic visitor responses in the stored (code) format, for benchmarks.
+
+COUNTRIES = ["Norway", "Germany", "United States", "Sweden", "Denmark", "United Kingdom", "France",
+             "Spain", "Netherlands", "Italy", "Poland", "China", "Japan", "Korea, Republic of", "Finland"]
+PHRASES = ["more seating", "longer tour", "bigger screens", "Flere sitteplasser", "bedre skilting",
+           "the video was too long", "mer smaksprøver", "", "", ""]
+
+
+def synthetic_rows(n, seed=0, start=date(2025, 1, 1), days=365):
+    rng = random.Random(seed)
+    option_codes = {question: list(options) for question, options in OPTIONS.items()}
+    for i in range(n):
+        row = {
+            "date": (start + timedelta(days=i * days // max(n, 1))).isoformat(),
+            "time": f"{rng.randrange(9, 18):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+            "lang": rng.choice(("English", "Norsk")),
+            "country": rng.choice(COUNTRIES),
+            "improvement": rng.choice(PHRASES),
+        }
+        for question, codes in option_codes.items():
+            if question in MULTI_SELECT_FIELDS:
+                row[question] = MULTI_SELECT_SEPARATOR.join(rng.sample(codes, rng.randrange(len(codes))))
+            else:
+                row[question] = rng.choice(codes + [""])
+        for field in SCORE_FIELDS:
+            row[field] = rng.choice(("5", "5", "4", "4", "3", "2", "1", ""))
+        yield row
+
+
+def write_csv(path, n, seed=0):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=VISITOR_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(synthetic_rows(n, seed))
@@ -0,0 +1,71 @@
+import argparse
+import csv
+import gettext
+import os
+from collections import Counter
+
+import pycountry
+
+from storage import CSV_PATH
+
+# Generates country_index.py: the country names the form offers, in English
+# and Norwegian, with the most frequent visitor countries first. The form then
+# imports this small module instead of pycountry's full database.
+#
+#     python build_country_index.py [visitor_data.csv]
+
+OUTPUT = "country_index.py"
+TOP = 15
+# Used when there are too few past responses to rank by.
+DEFAULT_TOP = ["Norway", "Sweden", "Denmark", "Germany", "United States", "United Kingdom",
+               "Netherlands", "France", "Spain", "Italy", "Poland", "Finland", "China", "Japan", "India"]
+
+
+def norwegian_names():
+    translation = gettext.translation("iso3166-1", pycountry.LOCALES_DIR, languages=["nb_NO"], fallback=True)
+    return {country.name: translation.gettext(country.name) for country in pycountry.countries}
+
+
+def visitor_counts(path):
+    counts = Counter()
+    if os.path.isfile(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            counts.update(row["country"] for row in csv.DictReader(f) if row.get("country"))
+    return counts
+
+
+def build(csv_path=CSV_PATH, top=TOP):
+    names = norwegian_names()
+    counts = visitor_counts(csv_path)
+    ranked = [name for name, _ in counts.most_common() if name in names]
+    for name in DEFAULT_TOP:
+        if name not in ranked:
+            ranked.append(name)
+    ranked = ranked[:top]
+    rest = sorted((name for name in names if name not in ranked), key=str.casefold)
+    return [(name, names[name]) for name in ranked + rest], len(ranked)
+
+
+def write_module(entries, top, path=OUTPUT):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Generated by build_country_index.py; do not edit by hand.\n")
+        f.write("# (English name, Norwegian name), most frequent visitor countries first.\n\n")
+        f.write(f"TOP = {top}\n\n")
+        f.write("COUNTRIES = (\n")
+        for english, norwegian in entries:
+            f.write(f"    ({english!r}, {norwegian!r}),\n")
+        f.write(")\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the compact country index")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH, help="past responses used to rank countries")
+    parser.add_argument("--top", type=int, default=TOP)
+    args = parser.parse_args()
+    entries, top = build(args.csv_path, args.top)
+    write_module(entries, top)
+    print(f"Wrote {len(entries)} countries ({top} ranked first) to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()
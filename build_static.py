@@ -0,0 +1,77 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+from resources import STATIC_DIR, STATIC_MANIFEST, source_hash
+
+# Generates the branding images Streamlit serves from static/ (see
+# .streamlit/config.toml): each image resized to the widths the pages display
+# it at, at 1x and 2x for high-density kiosk screens, under content-hashed
+# file names so browsers can keep them for as long as they like. The
+# manifest maps image and display width to those file names, and records a
+# hash of each source image; pages fall back to the original image once it
+# no longer matches, until this is run again.
+#
+#     python build_static.py [logo.png stack.png ...]
+
+IMAGES = ("logo.png", "stack.png")
+WIDTHS = (90, 120)
+DENSITIES = (1, 2)
+
+
+def resized_png(image, width):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+    buffer = io.BytesIO()
+    resized.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build(images=IMAGES, widths=WIDTHS, out_dir=STATIC_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for path in images:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        with Image.open(path) as image:
+            image.load()
+            entries = {}
+            manifest[os.path.basename(path)] = {"source": source_hash(path), "widths": entries}
+            for width in widths:
+                variants = entries[str(width)] = {}
+                for density in DENSITIES:
+                    data = resized_png(image, width * density)
+                    name = f"{stem}-{width}-{density}x.{hashlib.sha256(data).hexdigest()[:12]}.png"
+                    with open(os.path.join(out_dir, name), "wb") as f:
+                        f.write(data)
+                    variants[f"{density}x"] = name
+    return manifest
+
+
+def remove_stale(manifest, out_dir=STATIC_DIR):
+    keep = {name for entry in manifest.values() for variants in entry["widths"].values() for name in variants.values()}
+    for name in os.listdir(out_dir):
+        if name.endswith(".png") and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the resized, content-hashed branding images")
+    parser.add_argument("images", nargs="*", default=IMAGES)
+    parser.add_argument("--width", type=int, action="append", help="display width in px (default: 90 and 120)")
+    args = parser.parse_args()
+    manifest = build(args.images, args.width or WIDTHS)
+    with open(STATIC_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    remove_stale(manifest)
+    total = sum(os.path.getsize(os.path.join(STATIC_DIR, name)) for entry in manifest.values()
+                for variants in entry["widths"].values() for name in variants.values())
+    print(f"Wrote {len(manifest)} images ({total / 1024:.0f} KiB of variants) and {STATIC_MANIFEST}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# Generated by build_country_index.py; do not edit by hand.
+# (English name, Norwegian name), most frequent visitor countries first.
+
+TOP = 15
+
+COUNTRIES = (
+    ('Norway', 'Norge'),
+    ('Sweden', 'Sverige'),
+    ('Denmark', 'Danmark'),
+    ('Germany', 'Tyskland'),
+    ('United States', 'De forente stater'),
+    ('United Kingdom', 'Storbritannia'),
+    ('Netherlands', 'Nederland'),
+    ('France', 'Frankrike'),
+    ('Spain', 'Spania'),
+    ('Italy', 'Italia'),
+    ('Poland', 'Polen'),
+    ('Finland', 'Finland'),
+    ('China', 'Kina'),
+    ('Japan', 'Japan'),
+    ('India', 'India'),
+    ('Afghanistan', 'Afghanistan'),
+    ('Albania', 'Albania'),
+    ('Algeria', 'Algerie'),
+    ('American Samoa', 'Amerikansk Samoa'),
+    ('Andorra', 'Andorra'),
+    ('Angola', 'Angola'),
+    ('Anguilla', 'Anguilla'),
+    ('Antarctica', 'Antarktika'),
+    ('Antigua and Barbuda', 'Antigua og Barbuda'),
+    ('Argentina', 'Argentina'),
+    ('Armenia', 'Armenia'),
+    ('Aruba', 'Aruba'),
+    ('Australia', 'Australia'),
+    ('Austria', 'Østerrike'),
+    ('Azerbaijan', 'Aserbajdsjan'),
+    ('Bahamas', 'Bahamas'),
+    ('Bahrain', 'Bahrain'),
+    ('Bangladesh', 'Bangladesh'),
+    ('Barbados', 'Barbados'),
+    ('Belarus', 'Hviterussland'),
+    ('Belgium', 'Belgia'),
+    ('Belize', 'Belize'),
+    ('Benin', 'Benin'),
+    ('Bermuda', 'Bermuda'),
+    ('Bhutan', 'Bhutan'),
+    ('Bolivia, Plurinational State of', 'Bolivia, den flernasjonale stat'),
+    ('Bonaire, Sint Eustatius and Saba', 'Bonaire, Sint Eustatius og Saba'),
+    ('Bosnia and Herzegovina', 'Bosnia-Hercegovina'),
+    ('Botswana', 'Botswana'),
+    ('Bouvet Island', 'Bouvetøya'),
+    ('Brazil', 'Brasil'),
+    ('British Indian Ocean Territory', 'Det britiske territoriet i Indiahavet'),
+    ('Brunei Darussalam', 'Brunei Darussalam'),
+    ('Bulgaria', 'Bulgaria'),
+    ('Burkina Faso', 'Burkina Faso'),
+    ('Burundi', 'Burundi'),
+    ('Cabo Verde', 'Kapp Verde'),
+    ('Cambodia', 'Kambodsja'),
+    ('Cameroon', 'Kamerun'),
+    ('Canada', 'Canada'),
+    ('Cayman Islands', 'Caymanøyene'),
+    ('Central African Republic', 'Den sentralafrikanske republikk'),
+    ('Chad', 'Tsjad'),
+    ('Chile', 'Chile'),
+    ('Christmas Island', 'Christmasøya'),
+    ('Cocos (Keeling) Islands', 'Kokosøyene'),
+    ('Colombia', 'Colombia'),
+    ('Comoros', 'Komorene'),
+    ('Congo', 'Kongo'),
+    ('Congo, The Democratic Republic of the', 'Kongo, Den demokratiske republikk'),
+    ('Cook Islands', 'Cookøyene'),
+    ('Costa Rica', 'Costa Rica'),
+    ('Croatia', 'Kroatia'),
+    ('Cuba', 'Cuba'),
+    ('Curaçao', 'Curaçao'),
+    ('Cyprus', 'Kypros'),
+    ('Czechia', 'Tsjekkia'),
+    ("Côte d'Ivoire", 'Elfenbenskysten'),
+    ('Djibouti', 'Djibouti'),
+    ('Dominica', 'Dominica'),
+    ('Dominican Republic', 'Den dominikanske republikk'),
+    ('Ecuador', 'Ecuador'),
+    ('Egypt', 'Egypt'),
+    ('El Salvador', 'El Salvador'),
+    ('Equatorial Guinea', 'Ekvatorial-Guinea'),
+    ('Eritrea', 'Eritrea'),
+    ('Estonia', 'Estland'),
+    ('Eswatini', 'Eswatini (tidligere Swasiland)'),
+    ('Ethiopia', 'Etiopia'),
+    ('Falkland Islands (Malvinas)', 'Falklandsøyene'),
+    ('Faroe Islands', 'Færøyene'),
+    ('Fiji', 'Fiji'),
+    ('French Guiana', 'Fransk Guyana'),
+    ('French Polynesia', 'Fransk Polynesia'),
+    ('French Southern Territories', 'Franske sørlige territorier'),
+    ('Gabon', 'Gabon'),
+    ('Gambia', 'Gambia'),
+    ('Georgia', 'Georgia'),
+    ('Ghana', 'Ghana'),
+    ('Gibraltar', 'Gibraltar'),
+    ('Greece', 'Hellas'),
+    ('Greenland', 'Grønland'),
+    ('Grenada', 'Grenada'),
+    ('Guadeloupe', 'Guadeloupe'),
+    ('Guam', 'Guam'),
+    ('Guatemala', 'Guatemala'),
+    ('Guernsey', 'Guernsey'),
+    ('Guinea', 'Guinea'),
+    ('Guinea-Bissau', 'Guinea-Bissau'),
+    ('Guyana', 'Guyana'),
+    ('Haiti', 'Haiti'),
+    ('Heard Island and McDonald Islands', 'Heard- og McDonaldøyene'),
+    ('Holy See (Vatican City State)', 'Vatikanstaten'),
+    ('Honduras', 'Honduras'),
+    ('Hong Kong', 'Hongkong'),
+    ('Hungary', 'Ungarn'),
+    ('Iceland', 'Island'),
+    ('Indonesia', 'Indonesia'),
+    ('Iran, Islamic Republic of', 'Iran, Den islamske republikk'),
+    ('Iraq', 'Irak'),
+    ('Ireland', 'Irland'),
+    ('Isle of Man', 'Man'),
+    ('Israel', 'Israel'),
+    ('Jamaica', 'Jamaica'),
+    ('Jersey', 'Jersey'),
+    ('Jordan', 'Jordan'),
+    ('Kazakhstan', 'Kasakhstan'),
+    ('Kenya', 'Kenya'),
+    ('Kiribati', 'Kiribati'),
+    ("Korea, Democratic People's Republic of", 'Korea, Den demokratiske folkerepublikk'),
+    ('Korea, Republic of', 'Korea, Republikken'),
+    ('Kuwait', 'Kuwait'),
+    ('Kyrgyzstan', 'Kirgisistan'),
+    ("Lao People's Democratic Republic", 'Den demokratiske folkerepublikk Laos'),
+    ('Latvia', 'Latvia'),
+    ('Lebanon', 'Libanon'),
+    ('Lesotho', 'Lesotho'),
+    ('Liberia', 'Liberia'),
+    ('Libya', 'Libya'),
+    ('Liechtenstein', 'Liechtenstein'),
+    ('Lithuania', 'Litauen'),
+    ('Luxembourg', 'Luxembourg'),
+    ('Macao', 'Macao'),
+    ('Madagascar', 'Madagaskar'),
+    ('Malawi', 'Malawi'),
+    ('Malaysia', 'Malaysia'),
+    ('Maldives', 'Maldivene'),
+    ('Mali', 'Mali'),
+    ('Malta', 'Malta'),
+    ('Marshall Islands', 'Marshalløyene'),
+    ('Martinique', 'Martinique'),
+    ('Mauritania', 'Mauritania'),
+    ('Mauritius', 'Mauritius'),
+    ('Mayotte', 'Mayotte'),
+    ('Mexico', 'Mexico'),
+    ('Micronesia, Federated States of', 'Mikronesia, Føderasjonen'),
+    ('Moldova, Republic of', 'Moldova, Republikken'),
+    ('Monaco', 'Monaco'),
+    ('Mongolia', 'Mongolia'),
+    ('Montenegro', 'Montenegro'),
+    ('Montserrat', 'Montserrat'),
+    ('Morocco', 'Marokko'),
+    ('Mozambique', 'Mosambik'),
+    ('Myanmar', 'Myanmar'),
+    ('Namibia', 'Namibia'),
+    ('Nauru', 'Nauru'),
+    ('Nepal', 'Nepal'),
+    ('New Caledonia', 'Ny-Caledonia'),
+    ('New Zealand', 'New Zealand'),
+    ('Nicaragua', 'Nicaragua'),
+    ('Niger', 'Niger'),
+    ('Nigeria', 'Nigeria'),
+    ('Niue', 'Niue'),
+    ('Norfolk Island', 'Norfolkøya'),
+    ('North Macedonia', 'Nord-Makedonia'),
+    ('Northern Mariana Islands', 'Nord-Marianene'),
+    ('Oman', 'Oman'),
+    ('Pakistan', 'Pakistan'),
+    ('Palau', 'Palau'),
+    ('Palestine, State of', 'Palestina, staten'),
+    ('Panama', 'Panama'),
+    ('Papua New Guinea', 'Papua Ny-Guinea'),
+    ('Paraguay', 'Paraguay'),
+    ('Peru', 'Peru'),
+    ('Philippines', 'Filippinene'),
+    ('Pitcairn', 'Pitcairn'),
+    ('Portugal', 'Portugal'),
+    ('Puerto Rico', 'Puerto Rico'),
+    ('Qatar', 'Qatar'),
+    ('Romania', 'Romania'),
+    ('Russian Federation', 'Den russiske føderasjon'),
+    ('Rwanda', 'Rwanda'),
+    ('Réunion', 'Réunion'),
+    ('Saint Barthélemy', 'Saint-Barthélemy'),
+    ('Saint Helena, Ascension and Tristan da Cunha', 'Saint Helena, Ascension og Tristan da Cunha'),
+    ('Saint Kitts and Nevis', 'Saint Kitts og Nevis'),
+    ('Saint Lucia', 'Saint Lucia'),
+    ('Saint Martin (French part)', 'Saint Martin (fransk del)'),
+    ('Saint Pierre and Miquelon', 'Saint-Pierre og Miquelon'),
+    ('Saint Vincent and the Grenadines', 'Saint Vincent og Grenadinene'),
+    ('Samoa', 'Samoa'),
+    ('San Marino', 'San Marino'),
+    ('Sao Tome and Principe', 'São Tomé og Príncipe'),
+    ('Saudi Arabia', 'Saudi-Arabia'),
+    ('Senegal', 'Senegal'),
+    ('Serbia', 'Serbia'),
+    ('Seychelles', 'Seychellene'),
+    ('Sierra Leone', 'Sierra Leone'),
+    ('Singapore', 'Singapore'),
+    ('Sint Maarten (Dutch part)', 'Sint Maarten (nederlandsk del)'),
+    ('Slovakia', 'Slovakia'),
+    ('Slovenia', 'Slovenia'),
+    ('Solomon Islands', 'Salomonøyene'),
+    ('Somalia', 'Somalia'),
+    ('South Africa', 'Sør-Afrika'),
+    ('South Georgia and the South Sandwich Islands', 'Sør-Georgia og Sør-Sandwichøyene'),
+    ('South Sudan', 'Sør-Sudan'),
+    ('Sri Lanka', 'Sri Lanka'),
+    ('Sudan', 'Sudan'),
+    ('Suriname', 'Surinam'),
+    ('Svalbard and Jan Mayen', 'Svalbard og Jan Mayen'),
+    ('Switzerland', 'Sveits'),
+    ('Syrian Arab Republic', 'Den arabiske republikk Syria'),
+    ('Taiwan, Province of China', 'Taiwan, Den kinesiske provins'),
+    ('Tajikistan', 'Tadsjikistan'),
+    ('Tanzania, United Republic of', 'Tanzania, Forbundsrepublikken'),
+    ('Thailand', 'Thailand'),
+    ('Timor-Leste', 'Øst-Timor'),
+    ('Togo', 'Togo'),
+    ('Tokelau', 'Tokelau'),
+    ('Tonga', 'Tonga'),
+    ('Trinidad and Tobago', 'Trinidad og Tobago'),
+    ('Tunisia', 'Tunisia'),
+    ('Turkmenistan', 'Turkmenistan'),
+    ('Turks and Caicos Islands', 'Turks- og Caicosøyene'),
+    ('Tuvalu', 'Tuvalu'),
+    ('Türkiye', 'Tyrkia'),
+    ('Uganda', 'Uganda'),
+    ('Ukraine', 'Ukraina'),
+    ('United Arab Emirates', 'De forente arabiske emirater'),
+    ('United States Minor Outlying Islands', 'Mindre utenforliggende øyer til USA'),
+    ('Uruguay', 'Uruguay'),
+    ('Uzbekistan', 'Usbekistan'),
+    ('Vanuatu', 'Vanuatu'),
+    ('Venezuela, Bolivarian Republic of', 'Venezuela, Republikken'),
+    ('Viet Nam', 'Vietnam'),
+    ('Virgin Islands, British', 'Jomfruøyene (Storbritannia)'),
+    ('Virgin Islands, U.S.', 'Jomfruøyene (USA)'),
+    ('Wallis and Futuna', 'Wallis og Futunaøyene'),
+    ('Western Sahara', 'Vest-Sahara'),
+    ('Yemen', 'Jemen'),
+    ('Zambia', 'Zambia'),
+    ('Zimbabwe', 'Zimbabwe'),
+    ('Åland Islands', 'Åland'),
+)
@@ -0,0 +1,115 @@
+import csv
+import os
+from collections import Counter
+
+from storage import (BufferedWriter, MULTI_SELECT_FIELDS, MULTI_SELECT_SEPARATOR, VISITOR_FIELDS, fsync_directory,
+                     row_key)
+
+# Buffered appender for visitor_data.csv. Multi-select answers are stored
+# comma-joined, as they always have been.
+
+
+def append_csv(path, rows, fieldnames, fsync=False):
+    created = not os.path.isfile(path)
+    write_header = created or os.path.getsize(path) == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        if write_header:
+            writer.writeheader()
+        writer.writerows(to_csv_row(row) for row in rows)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    if fsync and created:
+        fsync_directory(path)
+
+
+# Cuts a record torn by a crash off the end of a CSV file, reading from
+# `start`, a record boundary. Returns the number of bytes cut.
+def repair_csv(path, start=0):
+    if not os.path.isfile(path):
+        return 0
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        # A file smaller than the recorded end was replaced since.
+        end = start if start <= size else 0
+        f.seek(end)
+        record = b""
+        for line in f:
+            record += line
+            # Same test as CSVTail: quotes balance and the line is terminated.
+            if record.count(b'"') % 2 or not record.endswith(b"\n"):
+                continue
+            end += len(record)
+            record = b""
+        if end == size:
+            return 0
+        f.truncate(end)
+        f.flush()
+        os.fsync(f.fileno())
+    return size - end
+
+
+class BufferedCSVWriter(BufferedWriter):
+    def __init__(self, path, fieldnames=VISITOR_FIELDS, batch_size=20, flush_interval=5.0):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        super().__init__(batch_size, flush_interval)
+
+    def write_rows(self, rows):
+        append_csv(self.path, rows, self.fieldnames, self.durable)
+
+    def files(self, rows):
+        return [self.path]
+
+    def position(self, rows):
+        return {path: os.path.getsize(path) for path in self.files(rows) if os.path.isfile(path)}
+
+    def repair(self, rows, position):
+        return sum(repair_csv(path, (position or {}).get(path, 0)) for path in self.files(rows))
+
+    def stored_after(self, rows, position):
+        from aggregates import CSVTail
+
+        stored = Counter()
+        for path in self.files(rows):
+            if not os.path.isfile(path):
+                continue
+            start = (position or {}).get(path, 0)
+            tail = CSVTail(path)
+            # A file smaller than the recorded end was replaced since.
+            if 0 < start <= os.path.getsize(path):
+                tail.restore({"offset": start, "fieldnames": self.fieldnames})
+            stored.update(row_key(row) for row in tail.read_new())
+        return stored
+
+
+# One file per day in `root` (root/YYYY-MM-DD.csv), used for site shards.
+class ShardedCSVWriter(BufferedCSVWriter):
+    def write_rows(self, rows):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+            if self.durable:
+                fsync_directory(self.path)
+        by_date = {}
+        for row in rows:
+            by_date.setdefault(row["date"], []).append(row)
+        for date, date_rows in by_date.items():
+            append_csv(os.path.join(self.path, f"{date}.csv"), date_rows, self.fieldnames, self.durable)
+
+    def files(self, rows):
+        return [os.path.join(self.path, f"{date}.csv") for date in sorted({row["date"] for row in rows})]
+
+
+def shard_files(root):
+    if not os.path.isdir(root):
+        return []
+    return [os.path.join(root, name) for name in sorted(os.listdir(root)) if name.endswith(".csv")]
+
+
+def to_csv_row(row):
+    row = dict(row)
+    for field in MULTI_SELECT_FIELDS:
+        if isinstance(row.get(field), (list, tuple)):
+            row[field] = MULTI_SELECT_SEPARATOR.join(row[field])
+    return row
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# One pooled, keep-alive session per process for posting to Google Forms.
+
+OK_STATUSES = (200, 302, 303)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+
+class FormClient:
+    def __init__(self, ok_statuses=OK_STATUSES, retries=3, backoff=0.5,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), pool_size=4, endpoint_override=None):
+        self.ok_statuses = tuple(ok_statuses)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # Sends every post to another endpoint, e.g. a local stub in load tests.
+        self.endpoint_override = endpoint_override or os.environ.get("FORM_ENDPOINT_OVERRIDE")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.lock = threading.Lock()
+        self.counters = {
+            "attempts": 0,
+            "retries": 0,
+            "successes": 0,
+            "failures": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _record_latency(self, seconds):
+        with self.lock:
+            self.counters["latency_total"] += seconds
+            self.counters["latency_max"] = max(self.counters["latency_max"], seconds)
+
+    # Returns None on success, otherwise a short error description.
+    def post(self, url, data):
+        url = self.endpoint_override or url
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            self._count("attempts")
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, data=data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record_latency(time.perf_counter() - start)
+                error = repr(e)
+                continue
+            self._record_latency(time.perf_counter() - start)
+            if response.status_code in self.ok_statuses:
+                self._count("successes")
+                return None
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+        self._count("failures")
+        return error
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats["latency_mean"] = stats["latency_total"] / stats["attempts"] if stats["attempts"] else 0.0
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,147 @@
+import json
+import os
+from datetime import datetime
+from functools import lru_cache
+
+from resources import country_labeller, country_names, file_signature
+from sites import SITES_PATH, site_config
+from storage import VISITOR_FIELDS
+
+# form_schema.json is the single definition of the visitor form: questions,
+# option codes, labels per language, per-entry-point variants and Google Form
+# field ids. It is compiled once per process (and again only when the file
+# changes) into a renderer, a storage row serializer and a form payload
+# builder, so reruns reuse the prepared structures.
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "form_schema.json")
+
+
+@lru_cache(maxsize=4)
+def _load(path, signature):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_schema(path=SCHEMA_PATH):
+    return _load(path, file_signature(path))
+
+
+def variant_config(schema, variant):
+    config = dict(schema["variants"][variant])
+    parent = config.pop("extends", None)
+    if parent:
+        config = {**variant_config(schema, parent), **config}
+    return config
+
+
+class Question:
+    def __init__(self, spec, prompt, labels):
+        self.id = spec["id"]
+        self.type = spec["type"]
+        self.prompt = prompt
+        self.max_chars = spec.get("max_chars")
+        options = spec.get("options", [])
+        self.codes = [option["code"] if isinstance(option, dict) else option for option in options]
+        self.labels = labels
+
+    def format(self, code):
+        return self.labels.get(code, code)
+
+
+class CompiledForm:
+    def __init__(self, schema, variant, site_config=None):
+        config = variant_config(schema, variant)
+        self.variant = variant
+        self.languages = tuple(schema["languages"])
+        self.layout = config.get("layout", "labels")
+        self.preselect = config.get("preselect", True)
+        self.google_form = config.get("google_form")
+        # A site can post to its own copies of the Google Forms.
+        site_forms = (site_config or {}).get("google_form", {}).get(variant)
+        if self.google_form and site_forms:
+            self.google_form = {**self.google_form, **site_forms}
+        self.ok_statuses = tuple(self.google_form["ok_statuses"]) if self.google_form else ()
+        self._texts = {}
+        self._questions = {}
+        prompts = config.get("prompts", {})
+        option_labels = config.get("option_labels", {})
+        for lang in self.languages:
+            questions = []
+            for spec in schema["questions"]:
+                prompt = prompts.get(spec["id"], spec["prompt"])[lang]
+                labels = {}
+                for option in spec.get("options", []):
+                    if isinstance(option, dict):
+                        override = option_labels.get(spec["id"], {}).get(option["code"], {})
+                        labels[option["code"]] = override.get(lang, option["labels"][lang])
+                questions.append(Question(spec, prompt, labels))
+            self._questions[lang] = questions
+            self._texts[lang] = {
+                **schema["texts"][lang],
+                **config.get("texts", {}).get(lang, {}),
+                **{question.id: question.prompt for question in questions},
+            }
+
+    def texts(self, lang):
+        return self._texts.get(lang, self._texts[self.languages[0]])
+
+    def questions(self, lang):
+        return self._questions.get(lang, self._questions[self.languages[0]])
+
+    # Draws the questions (inside the caller's st.form) and returns the
+    # answers keyed by question id, as option codes.
+    def render(self, lang):
+        import streamlit as st
+
+        html = self.layout == "html"
+        index = 0 if self.preselect else None
+        collapsed = {"label_visibility": "collapsed"} if html else {}
+        answers = {}
+        for question in self.questions(lang):
+            label = f"{question.id}_input" if html else question.prompt
+            if html:
+                st.markdown(f'<div class="question">{question.prompt}</div>', unsafe_allow_html=True)
+            if question.type == "country":
+                answers[question.id] = st.selectbox(label, country_names(lang), format_func=country_labeller(lang), **collapsed)
+            elif question.type in ("choice", "score"):
+                answers[question.id] = st.radio(label, question.codes, format_func=question.format, key=question.id,
+                                                index=index, horizontal=question.type == "score" and not html, **collapsed)
+            elif question.type == "multi":
+                if not html:
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    st.markdown(f"**{question.prompt}**")
+                answers[question.id] = [code for code in question.codes
+                                        if st.checkbox(question.format(code), key=f"{question.id}_{code}")]
+            elif question.type == "text":
+                answers[question.id] = st.text_area(label, key=question.id, max_chars=question.max_chars, **collapsed)
+        return answers
+
+    def to_row(self, answers, lang, now=None):
+        now = now or datetime.now()
+        row = {"date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M:%S"), "lang": lang}
+        row.update(answers)
+        return {field: row.get(field) for field in VISITOR_FIELDS}
+
+    # Returns (url, form data) for posting the answers to the Google Form.
+    # Choice answers are sent as the labels the form was built with.
+    def payload(self, answers, lang):
+        form = self.google_form[lang]
+        fields = form["fields"]
+        data = []
+        for question in self.questions(lang):
+            value = answers.get(question.id)
+            if question.id not in fields or value is None:
+                continue
+            values = value if question.type == "multi" else [value]
+            for item in values:
+                data.append((fields[question.id], question.format(item) if question.type in ("choice", "multi") else item))
+        return form["url"], data
+
+
+@lru_cache(maxsize=64)
+def _compile(variant, site, path, signature, sites_signature):
+    return CompiledForm(_load(path, signature), variant, site_config(site))
+
+
+def compiled_form(variant, site=None, path=SCHEMA_PATH):
+    return _compile(variant, site, path, file_signature(path), file_signature(SITES_PATH) if site else None)
@@ -0,0 +1,28 @@
+import time
+
+import streamlit as st
+
+# In-app kiosk turnover: after the thank-you page has been shown for a few
+# seconds, clear the visitor's answers and rerun into a fresh form within the
+# same Streamlit session, instead of a full browser reload.
+
+RESET_AFTER = 5
+
+
+def reset_form():
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+@st.fragment(run_every=1)
+def _reset_countdown():
+    if time.time() - st.session_state.get("submitted_at", 0) >= st.session_state.get("reset_after", RESET_AFTER):
+        reset_form()
+        st.rerun()
+
+
+def schedule_reset(seconds=RESET_AFTER):
+    if "submitted_at" not in st.session_state:
+        st.session_state.submitted_at = time.time()
+    st.session_state.reset_after = seconds
+    _reset_countdown()
@@ -0,0 +1,262 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-process run metrics for the kiosk scripts: how long each phase of a
+# script run takes (CSS, logo, widgets, storage append, form spool, the gap
+# between st.rerun() and the next run) and counters for submissions, form
+# posts, retries and sessions. Everything is kept in memory and exported in
+# the Prometheus text format, either on a local HTTP endpoint
+# (METRICS_PORT=9108, scrape /metrics) or as snapshots appended to a
+# rotating file (METRICS_FILE=metrics.prom), or both.
+
+PREFIX = "visitor"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_HOST = "127.0.0.1"
+FILE_INTERVAL = 15.0
+FILE_MAX_BYTES = 5 * 1024 * 1024
+FILE_BACKUPS = 3
+# Session ids remembered for sessions_total. A session forgotten after this
+# many newer ones is counted again if it comes back.
+MAX_SESSIONS = 4096
+
+HELP = {
+    "phase_seconds": "Time spent in each phase of a script run.",
+    "runs_total": "Script runs.",
+    "sessions_total": "Browser sessions seen.",
+    "submissions_total": "Submitted forms.",
+    "submissions_rejected_total": "Submissions dropped by the submit guard, by reason.",
+    "form_posts_total": "Spooled submissions posted to the form endpoint, by result.",
+    "storage_write_seconds": "Time spent writing a batch of buffered rows.",
+    "stored_rows_total": "Rows written by the storage backend.",
+    "storage_flush_errors_total": "Periodic flushes of buffered rows that failed and will be retried.",
+    "rollup_update_seconds": "Time to fold newly stored rows into the daily and monthly rollups.",
+    "wal_commit_seconds": "Time to write and fsync one group commit to the write-ahead log.",
+    "wal_compact_seconds": "Time to copy a batch of logged rows into the storage backend.",
+    "wal_fsyncs_total": "Group commits (fsyncs) of the write-ahead log.",
+    "wal_records_total": "Records committed to the write-ahead log.",
+    "wal_truncated_bytes_total": "Bytes of torn records dropped from the log on recovery.",
+    "wal_sink_repaired_bytes_total": "Bytes of a torn row cut off the storage backend on recovery.",
+    "wal_recovered_rows_total": "Compacted rows found already stored on recovery and not written again.",
+    "wal_commit_errors_total": "Group commits to the write-ahead log that failed.",
+    "wal_compact_errors_total": "Compactions of the write-ahead log that failed and will be retried.",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+        self.sessions = OrderedDict()
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][bisect_left(BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+
+    # Returns True the first time a session id is seen. Ids are kept in an
+    # LRU, so every phone that ever scanned the QR code does not stay in memory.
+    def session_seen(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                self.sessions.move_to_end(session_id)
+                return False
+            self.sessions[session_id] = None
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+            return True
+
+    # `collect` returns {name: value}; exported as gauges named
+    # <PREFIX>_<prefix>_<name> at scrape time, e.g. FormClient.stats.
+    def register(self, prefix, collect):
+        with self.lock:
+            self.collectors[prefix] = collect
+
+    def render(self, timestamp=None):
+        suffix = f" {int(timestamp * 1000)}" if timestamp else ""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: ([*buckets], total) for key, (buckets, total) in self.histograms.items()}
+            collectors = dict(self.collectors)
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{metric}{_labels_text(labels)} {value}{suffix}")
+        for name in sorted({name for name, _ in histograms}):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (histogram, labels), (buckets, total) in sorted(histograms.items()):
+                if histogram != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip((*BUCKETS, "+Inf"), buckets):
+                    cumulative += n
+                    lines.append(f"{metric}_bucket{_labels_text(labels + (('le', bound),))} {cumulative}{suffix}")
+                lines.append(f"{metric}_sum{_labels_text(labels)} {total:.6f}{suffix}")
+                lines.append(f"{metric}_count{_labels_text(labels)} {cumulative}{suffix}")
+        for prefix, collect in sorted(collectors.items()):
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"metrics: collector {prefix} failed: {e!r}", file=sys.stderr)
+                continue
+            for name, value in sorted(values.items()):
+                metric = f"{PREFIX}_{prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}{suffix}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+count = REGISTRY.count
+observe = REGISTRY.observe
+register = REGISTRY.register
+
+
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host=METRICS_HOST):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Appends a timestamped snapshot every `interval` seconds; the file is rotated
+# to path.1 .. path.<backups> once it grows past max_bytes.
+class FileExporter(threading.Thread):
+    def __init__(self, path, interval=FILE_INTERVAL, max_bytes=FILE_MAX_BYTES, backups=FILE_BACKUPS):
+        super().__init__(name="metrics-file", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.write()
+
+    def rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self):
+        snapshot = REGISTRY.render(timestamp=time.time())
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(snapshot) > self.max_bytes:
+            self.rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(snapshot)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        try:
+            serve(int(port))
+        except OSError as e:
+            print(f"metrics: cannot listen on port {port}: {e}", file=sys.stderr)
+    path = os.environ.get("METRICS_FILE")
+    if path:
+        FileExporter(path).start()
+
+
+# One script run, split into phases like profiling.mark(): run.mark(name)
+# records the time since the previous mark. Scripts call run.rerun() instead
+# of st.rerun() and run.end() as their last statement.
+class ScriptRun:
+    def __init__(self, script, site=None):
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        self.st = st
+        self.labels = {"script": script, "site": site} if site else {"script": script}
+        self.start = self.last = time.perf_counter()
+        start_exporters()
+        count("runs_total", **self.labels)
+        ctx = get_script_run_ctx()
+        if ctx is not None and REGISTRY.session_seen(ctx.session_id):
+            count("sessions_total", **self.labels)
+        requested = st.session_state.pop("_rerun_requested_at", None)
+        if requested is not None:
+            observe("phase_seconds", self.start - requested, phase="rerun", **self.labels)
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        observe("phase_seconds", now - self.last, phase=phase, **self.labels)
+        self.last = now
+
+    def count(self, name, amount=1):
+        count(name, amount, **self.labels)
+
+    def rerun(self):
+        self.end()
+        self.st.session_state["_rerun_requested_at"] = time.perf_counter()
+        self.st.rerun()
+
+    def end(self):
+        observe("phase_seconds", time.perf_counter() - self.start, phase="total", **self.labels)
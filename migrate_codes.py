@@ -0,0 +1,65 @@
+import argparse
+import csv
+import os
+import shutil
+
+from questions import OPTIONS, to_code
+from storage import MULTI_SELECT_FIELDS, MULTI_SELECT_SEPARATOR
+
+# Rewrites visitor_data.csv files written with localized labels (English,
+# Norsk or a mix of both) to the language-neutral option codes. Rows that are
+# already coded pass through unchanged, so it is safe to run more than once.
+
+
+def migrate_row(row, unknown):
+    row = dict(row)
+    for question in OPTIONS:
+        value = row.get(question)
+        if not value:
+            continue
+        values = value.split(MULTI_SELECT_SEPARATOR) if question in MULTI_SELECT_FIELDS else [value]
+        migrated = []
+        for item in values:
+            code = to_code(question, item)
+            if code is None:
+                unknown.add((question, item))
+                code = item
+            migrated.append(code)
+        row[question] = MULTI_SELECT_SEPARATOR.join(migrated)
+    return row
+
+
+def migrate_csv(src, dst):
+    unknown = set()
+    rows = 0
+    with open(src, newline="", encoding="utf-8") as fin, open(dst, "w", newline="", encoding="utf-8") as fout:
+        reader = csv.DictReader(fin)
+        writer = csv.DictWriter(fout, fieldnames=reader.fieldnames, lineterminator="\n")
+        writer.writeheader()
+        for row in reader:
+            writer.writerow(migrate_row(row, unknown))
+            rows += 1
+    return rows, unknown
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert localized answers in a responses CSV to option codes")
+    parser.add_argument("csv_path", nargs="?", default="visitor_data.csv")
+    parser.add_argument("-o", "--output", help="write here instead of rewriting csv_path in place (a .bak copy is kept)")
+    args = parser.parse_args()
+
+    if args.output:
+        rows, unknown = migrate_csv(args.csv_path, args.output)
+    else:
+        backup = args.csv_path + ".bak"
+        shutil.copy2(args.csv_path, backup)
+        tmp = args.csv_path + ".tmp"
+        rows, unknown = migrate_csv(backup, tmp)
+        os.replace(tmp, args.csv_path)
+    print(f"Migrated {rows} rows")
+    for question, value in sorted(unknown):
+        print(f"  unmapped {question}: {value!r} (kept as is)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Durable local spool of form submissions. The Streamlit script only appends
+# to it, before any network attempt; a background worker (or `python outbox.py
+# replay` after an outage) drains it to the form endpoint.
+#
+# Every entry carries an idempotency key. Adding the same key twice is a
+# no-op, entries are claimed atomically (also across processes) before they
+# are sent, and sent entries are kept as markers for a while, so neither a
+# repeated submit nor a concurrent replay posts the same answers twice.
+
+OUTBOX_PATH = "form_outbox.db"
+MAX_BACKOFF = 300
+CLAIM_LEASE = 120
+SENT_RETENTION = 7 * 24 * 3600
+BATCH_SIZE = 20
+CONCURRENCY = 4
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        for column, definition in (("key", "TEXT"), ("status", "TEXT NOT NULL DEFAULT 'pending'"),
+                                   ("claimed_until", "REAL NOT NULL DEFAULT 0"), ("sent_at", "REAL")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {definition}")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS outbox_key ON outbox (key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)")
+
+    # Returns the entry's idempotency key.
+    def put(self, url, data, key=None):
+        key = key or uuid.uuid4().hex
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, url, data, created) VALUES (?, ?, ?, ?)",
+                (key, url, json.dumps(data), time.time()),
+            )
+        self.wakeup.set()
+        return key
+
+    # Marks up to `limit` due entries as being sent and returns them. Entries
+    # whose sender died keep their claim until the lease runs out.
+    def claim(self, limit=BATCH_SIZE):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, url, data, attempts FROM outbox "
+                    "WHERE (status = 'pending' AND next_attempt <= ?) OR (status = 'sending' AND claimed_until < ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, now, limit),
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE outbox SET status = 'sending', claimed_until = ? WHERE id = ?",
+                    [(now + CLAIM_LEASE, row[0]) for row in rows],
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [(row_id, url, [tuple(pair) for pair in json.loads(data)], attempts)
+                for row_id, url, data, attempts in rows]
+
+    def done(self, row_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, data = '[]', last_error = NULL WHERE id = ?",
+                (time.time(), row_id),
+            )
+
+    def retry_later(self, row_id, attempts, error):
+        delay = min(2 ** attempts, MAX_BACKOFF)
+        with self.lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (attempts + 1, time.time() + delay, error, row_id),
+            )
+
+    # Makes every unsent entry due now, e.g. once the network is back.
+    def reschedule_all(self):
+        with self.lock:
+            self.conn.execute("UPDATE outbox SET next_attempt = 0 WHERE status = 'pending'")
+        self.wakeup.set()
+
+    def purge_sent(self, older_than=SENT_RETENTION):
+        with self.lock:
+            self.conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (time.time() - older_than,))
+
+    def size(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status != 'sent'").fetchone()[0]
+
+
+def send_batch(outbox, send, batch, pool):
+    def send_one(entry):
+        row_id, url, data, attempts = entry
+        try:
+            error = send(url, data)
+        except Exception as e:
+            error = repr(e)
+        if error is None:
+            outbox.done(row_id)
+            metrics.count("form_posts_total", result="sent")
+            return True
+        outbox.retry_later(row_id, attempts, error)
+        metrics.count("form_posts_total", result="failed")
+        return False
+
+    return sum(pool.map(send_one, batch))
+
+
+class OutboxWorker(threading.Thread):
+    def __init__(self, outbox, send=None, poll_interval=5.0, concurrency=CONCURRENCY):
+        super().__init__(name="form-outbox-worker", daemon=True)
+        self.outbox = outbox
+        if send is None:
+            from form_http import FormClient
+            send = FormClient().post
+        self.send = send
+        self.poll_interval = poll_interval
+        self.pool = ThreadPoolExecutor(concurrency, thread_name_prefix="form-outbox-send")
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.drain()
+            self.outbox.wakeup.wait(self.poll_interval)
+            self.outbox.wakeup.clear()
+
+    def drain(self):
+        sent = 0
+        while not self.stopping.is_set():
+            batch = self.outbox.claim()
+            if not batch:
+                break
+            sent += send_batch(self.outbox, self.send, batch, self.pool)
+        return sent
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.outbox.wakeup.set()
+        self.join(timeout)
+        self.pool.shutdown()
+
+
+def start_outbox(path=OUTBOX_PATH, send=None, poll_interval=5.0):
+    outbox = Outbox(path)
+    outbox.purge_sent()
+    worker = OutboxWorker(outbox, send, poll_interval)
+    worker.start()
+    return outbox, worker
+
+
+def replay(path=OUTBOX_PATH, send=None, batch_size=50, concurrency=CONCURRENCY):
+    outbox = Outbox(path)
+    outbox.reschedule_all()
+    sent = failed = 0
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="form-outbox-replay") as pool:
+        while True:
+            batch = outbox.claim(batch_size)
+            if not batch:
+                break
+            delivered = send_batch(outbox, send, batch, pool)
+            sent += delivered
+            failed += len(batch) - delivered
+    return sent, failed, outbox.size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Form submission spool")
+    parser.add_argument("command", choices=("status", "replay"))
+    parser.add_argument("--path", default=OUTBOX_PATH, help="spool file, e.g. form_outbox_trial1.db for Trial1.py")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--ok-status", type=int, action="append", help="HTTP statuses counted as delivered")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(f"{Outbox(args.path).size()} submissions waiting in {args.path}")
+        return
+    from form_http import FormClient, OK_STATUSES
+
+    client = FormClient(ok_statuses=args.ok_status or OK_STATUSES, pool_size=args.concurrency)
+    sent, failed, pending = replay(args.path, client.post, args.batch_size, args.concurrency)
+    print(f"Replayed {sent} submissions, {failed} failed and rescheduled, {pending} still waiting")
+
+
+if __name__ == "__main__":
+    main()
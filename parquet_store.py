@@ -0,0 +1,160 @@
+import argparse
+import csv
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from storage import (BufferedWriter, CSV_PATH, MULTI_SELECT_FIELDS, PARQUET_ROOT, SCORE_FIELDS, fsync_directory, row_key,
+                     split_multi_select)
+
+# Columnar storage for visitor responses: one Parquet file per flush, under
+# hive-style date=YYYY-MM-DD partitions. Low-cardinality answers are
+# dictionary-encoded, scores are int8 and multi-selects are list columns, so
+# reports can read just the columns they need without re-parsing strings.
+
+CATEGORY = pa.dictionary(pa.int8(), pa.string())
+SCHEMA = pa.schema([
+    ("time", pa.string()),
+    ("lang", CATEGORY),
+    ("country", pa.dictionary(pa.int16(), pa.string())),
+    ("info_source", CATEGORY),
+    ("gender", CATEGORY),
+    ("age", CATEGORY),
+    ("enjoyed", CATEGORY),
+    ("satisfaction", pa.int8()),
+    ("staff", pa.int8()),
+    ("cleanliness", pa.int8()),
+    ("purchase_factors", pa.list_(pa.string())),
+    ("association", pa.list_(pa.string())),
+    ("improvement", pa.string()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _score(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _text(value):
+    return None if value == "" else value
+
+
+def to_table(rows):
+    columns = {name: [] for name in SCHEMA.names}
+    for row in rows:
+        for name in SCHEMA.names:
+            value = row.get(name)
+            if name in SCORE_FIELDS:
+                value = _score(value)
+            elif name in MULTI_SELECT_FIELDS:
+                value = split_multi_select(value)
+            elif name != "improvement":
+                value = _text(value)
+            columns[name].append(value)
+    return pa.table(columns, schema=SCHEMA)
+
+
+# Returns the paths of the parts written, one per date.
+def write_partitions(root, rows, fsync=False):
+    paths = []
+    by_date = {}
+    for row in rows:
+        by_date.setdefault(row["date"], []).append(row)
+    for date, date_rows in by_date.items():
+        directory = os.path.join(root, f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        # Written under a hidden name (skipped by readers) and renamed into
+        # place, so a part is never seen half written.
+        tmp = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+        with open(tmp, "wb") as f:
+            pq.write_table(to_table(date_rows), f, compression="zstd")
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        if fsync:
+            fsync_directory(path)
+        paths.append(path)
+    return paths
+
+
+class ParquetWriter(BufferedWriter):
+    def __init__(self, root=PARQUET_ROOT, batch_size=50, flush_interval=30.0):
+        self.root = root
+        self.written = []
+        super().__init__(batch_size, flush_interval)
+
+    def write_rows(self, rows):
+        self.written = write_partitions(self.root, rows, self.durable)
+
+    # The newest part written per partition. Part names start with the
+    # second they were written in, so later parts sort at or after it.
+    def position(self, rows):
+        return {os.path.basename(os.path.dirname(path)): os.path.basename(path) for path in self.written}
+
+    def stored_after(self, rows, position):
+        stored = Counter()
+        for date in {row["date"] for row in rows}:
+            partition = f"date={date}"
+            directory = os.path.join(self.root, partition)
+            if not os.path.isdir(directory):
+                continue
+            last = (position or {}).get(partition, "")
+            for name in os.listdir(directory):
+                if name.endswith(".parquet") and name[:20] >= last[:20] and name != last:
+                    for row in pq.read_table(os.path.join(directory, name)).to_pylist():
+                        stored[row_key({**row, "date": date})] += 1
+        return stored
+
+
+def read_responses(root=PARQUET_ROOT, columns=None, start=None, end=None):
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    condition = None
+    if start is not None:
+        condition = ds.field("date") >= start
+    if end is not None:
+        upper = ds.field("date") <= end
+        condition = upper if condition is None else condition & upper
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+# Rows stored before option codes hold localized labels; they are mapped to
+# codes on the way, as migrate_codes.py does for the CSV.
+def convert_csv(csv_path=CSV_PATH, root=PARQUET_ROOT, chunk_size=50000):
+    from questions import to_codes
+
+    converted = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            for field in MULTI_SELECT_FIELDS:
+                row[field] = split_multi_select(row.get(field))
+            chunk.append(to_codes(row))
+            if len(chunk) >= chunk_size:
+                write_partitions(root, chunk)
+                converted += len(chunk)
+                chunk = []
+        if chunk:
+            write_partitions(root, chunk)
+            converted += len(chunk)
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert visitor_data.csv to partitioned Parquet")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("root", nargs="?", default=PARQUET_ROOT)
+    args = parser.parse_args()
+    print(f"Converted {convert_csv(args.csv_path, args.root)} rows into {args.root}")
+
+
+if __name__ == "__main__":
+    main()
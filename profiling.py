@@ -0,0 +1,71 @@
+import builtins
+import os
+import sys
+import time
+
+# Opt-in startup instrumentation (STARTUP_PROFILE=1). Times every top-level
+# import made after this module loads and the phases an entry script marks
+# with mark(), and prints a report to stderr after the first script run in
+# the process. When disabled, mark() and finish() are no-ops.
+
+ENABLED = os.environ.get("STARTUP_PROFILE") == "1"
+PROCESS_START = time.perf_counter()
+
+imports = []
+phases = []
+_last_mark = None
+_depth = 0
+_reported = False
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        if _depth == 0:
+            imports.append((name, time.perf_counter() - start))
+
+
+def start():
+    global _last_mark
+    _last_mark = time.perf_counter()
+
+
+# Records the time since the previous mark (or start()) as phase `name`.
+def mark(name):
+    global _last_mark
+    if not ENABLED or _reported:
+        return
+    now = time.perf_counter()
+    phases.append((name, now - (_last_mark or PROCESS_START)))
+    _last_mark = now
+
+
+def report():
+    lines = ["startup profile", "  imports:"]
+    for name, seconds in sorted(imports, key=lambda item: -item[1]):
+        lines.append(f"    {seconds * 1000:8.1f} ms  {name}")
+    lines.append("  phases:")
+    for name, seconds in phases:
+        lines.append(f"    {seconds * 1000:8.1f} ms  {name}")
+    lines.append(f"  total: {sum(seconds for _, seconds in phases) * 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def finish():
+    global _reported
+    if not ENABLED or _reported:
+        return
+    _reported = True
+    print(report(), file=sys.stderr)
+
+
+if ENABLED:
+    builtins.__import__ = _timed_import
@@ -0,0 +1,71 @@
+from functools import lru_cache
+
+from form_schema import load_schema, variant_config
+
+# Language-neutral answer options, as defined in form_schema.json. Responses
+# are stored as option codes; labels are only looked up when rendering the
+# form or a report. Codes are stable: never rename or reuse one.
+
+_schema = load_schema()
+LANGUAGES = tuple(_schema["languages"])
+
+# question -> {code: (label per language, in LANGUAGES order)}, in display order
+OPTIONS = {
+    spec["id"]: {option["code"]: tuple(option["labels"][lang] for lang in LANGUAGES) for option in spec["options"]}
+    for spec in _schema["questions"]
+    if spec["type"] in ("choice", "multi")
+}
+
+def _variant_labels(schema):
+    aliases = {}
+    for variant in schema["variants"]:
+        for question, overrides in variant_config(schema, variant).get("option_labels", {}).items():
+            for code, labels in overrides.items():
+                for text in labels.values():
+                    aliases.setdefault(question, {})[text] = code
+    return aliases
+
+
+# Labels used by other entry points (or older versions of the forms) that map
+# to an existing code.
+LEGACY_LABELS = _variant_labels(_schema)
+
+SCORES = next(spec["options"] for spec in _schema["questions"] if spec["type"] == "score")
+
+
+def codes(question):
+    return list(OPTIONS[question])
+
+
+def label(question, code, lang="English"):
+    labels = OPTIONS[question].get(code)
+    if labels is None:
+        return code
+    return labels[LANGUAGES.index(lang)] if lang in LANGUAGES else labels[0]
+
+
+@lru_cache(maxsize=None)
+def _code_lookup(question):
+    lookup = {code: code for code in OPTIONS[question]}
+    for code, labels in OPTIONS[question].items():
+        for text in labels:
+            lookup[text] = code
+    lookup.update(LEGACY_LABELS.get(question, {}))
+    return lookup
+
+
+# Returns the code for a label in any language (or for a code), else None.
+def to_code(question, value):
+    return _code_lookup(question).get(value)
+
+
+# Maps labels in any language to codes; values without a code are kept.
+def to_codes(row):
+    row = dict(row)
+    for question in OPTIONS:
+        value = row.get(question)
+        if isinstance(value, (list, tuple)):
+            row[question] = [to_code(question, item) or item for item in value]
+        elif value:
+            row[question] = to_code(question, value) or value
+    return row
@@ -0,0 +1,166 @@
+import argparse
+import os
+from collections import Counter
+
+import pandas as pd
+
+from csv_writer import shard_files
+from questions import OPTIONS, label
+from storage import CSV_PATH, MULTI_SELECT_FIELDS, MULTI_SELECT_SEPARATOR, SCORE_FIELDS, storage_location
+
+# Summary reports over visitor_data.csv computed in bounded memory: the file is
+# read as a stream of chunks and only the running totals are kept, so a year
+# of responses costs no more memory than a single chunk. With --from/--to (or
+# --rollups) the same tables come from the daily and monthly rollups instead
+# (see rollups.py), which costs the same whatever the size of the history.
+
+CHUNK_SIZE = 50_000
+CATEGORY_FIELDS = ("lang", "country", "info_source", "gender", "age", "enjoyed")
+SCORES = (1, 2, 3, 4, 5)
+
+
+# `path` is visitor_data.csv or a site's directory of daily CSV shards.
+def iter_chunks(path=CSV_PATH, chunk_size=CHUNK_SIZE, columns=None):
+    for file in shard_files(path) if os.path.isdir(path) else [path]:
+        yield from pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                               usecols=list(columns) if columns else None)
+
+
+class ChunkedReport:
+    def __init__(self):
+        self.rows = 0
+        self.categories = {field: Counter() for field in CATEGORY_FIELDS}
+        self.multi_select = {field: Counter() for field in MULTI_SELECT_FIELDS}
+        self.histograms = {field: Counter() for field in SCORE_FIELDS}
+        self.monthly_rows = Counter()
+        self.monthly_score_sums = {field: Counter() for field in SCORE_FIELDS}
+        self.monthly_score_counts = {field: Counter() for field in SCORE_FIELDS}
+
+    def add_chunk(self, chunk):
+        self.rows += len(chunk)
+        month = chunk["date"].str.slice(0, 7)
+        self.monthly_rows.update(month.value_counts().to_dict())
+        for field in CATEGORY_FIELDS:
+            values = chunk[field]
+            self.categories[field].update(values[values != ""].value_counts().to_dict())
+        for field in MULTI_SELECT_FIELDS:
+            values = chunk[field]
+            options = values[values != ""].str.split(MULTI_SELECT_SEPARATOR).explode()
+            self.multi_select[field].update(options.value_counts().to_dict())
+        for field in SCORE_FIELDS:
+            scores = pd.to_numeric(chunk[field], errors="coerce")
+            answered = scores.notna()
+            self.histograms[field].update(scores[answered].astype(int).value_counts().to_dict())
+            grouped = scores[answered].groupby(month[answered])
+            self.monthly_score_sums[field].update(grouped.sum().to_dict())
+            self.monthly_score_counts[field].update(grouped.count().to_dict())
+
+    # Adds the rollup totals of (part of) one month.
+    def add_summary(self, month, summary):
+        self.rows += summary.rows
+        self.monthly_rows[month] += summary.rows
+        for field in CATEGORY_FIELDS:
+            self.categories[field].update(summary.counts[field])
+        for field in MULTI_SELECT_FIELDS:
+            self.multi_select[field].update(summary.counts[field])
+        for field in SCORE_FIELDS:
+            self.histograms[field].update({int(score): n for score, n in summary.counts[field].items()})
+            self.monthly_score_sums[field][month] += summary.score_totals[field]
+            self.monthly_score_counts[field][month] += summary.score_counts[field]
+
+    def consume(self, chunks):
+        for chunk in chunks:
+            self.add_chunk(chunk)
+        return self
+
+    def _labelled(self, field, counts, lang):
+        if field in OPTIONS:
+            return {label(field, code, lang): n for code, n in counts.items()}
+        return dict(counts)
+
+    def category_table(self, field, lang="English"):
+        source = self.multi_select if field in MULTI_SELECT_FIELDS else self.categories
+        counts = self._labelled(field, source[field], lang)
+        table = pd.DataFrame(sorted(counts.items(), key=lambda item: -item[1]), columns=[field, "responses"])
+        table["share"] = (table["responses"] / self.rows).round(4) if self.rows else 0.0
+        return table
+
+    def score_table(self):
+        records = []
+        for field in SCORE_FIELDS:
+            histogram = self.histograms[field]
+            answered = sum(histogram.values())
+            total = sum(score * n for score, n in histogram.items())
+            record = {"question": field, "answered": answered, "mean": round(total / answered, 3) if answered else None}
+            record.update({str(score): histogram.get(score, 0) for score in SCORES})
+            records.append(record)
+        return pd.DataFrame(records)
+
+    def monthly_table(self):
+        records = []
+        for month in sorted(self.monthly_rows):
+            record = {"month": month, "responses": self.monthly_rows[month]}
+            for field in SCORE_FIELDS:
+                count = self.monthly_score_counts[field].get(month, 0)
+                record[f"{field}_mean"] = round(self.monthly_score_sums[field][month] / count, 3) if count else None
+            records.append(record)
+        return pd.DataFrame(records)
+
+    def tables(self, lang="English"):
+        tables = {"scores": self.score_table(), "monthly": self.monthly_table()}
+        for field in CATEGORY_FIELDS + MULTI_SELECT_FIELDS:
+            tables[field] = self.category_table(field, lang)
+        return tables
+
+
+def build_report(path=CSV_PATH, chunk_size=CHUNK_SIZE):
+    return ChunkedReport().consume(iter_chunks(path, chunk_size))
+
+
+# Brings the rollups up to date with the storage first.
+def build_rollup_report(start=None, end=None, backend=None, site=None):
+    from rollups import Rollups, rollup_path
+
+    rollups = Rollups(rollup_path(site))
+    rollups.update(backend, site)
+    report = ChunkedReport()
+    for month, summary in sorted(rollups.monthly(start, end).items()):
+        report.add_summary(month, summary)
+    rollups.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary tables for visitor_data.csv, computed chunk by chunk")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--site", help="report on this site's shard only (overrides csv_path)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--lang", default="English", help="label language for option codes")
+    parser.add_argument("--out", help="write each table as CSV into this directory instead of printing")
+    parser.add_argument("--from", dest="start", help="first date (YYYY-MM-DD) of a report from the rollups")
+    parser.add_argument("--to", dest="end", help="last date (YYYY-MM-DD) of a report from the rollups")
+    parser.add_argument("--rollups", action="store_true", help="report from the rollups even without a date range")
+    parser.add_argument("--storage", choices=("csv", "parquet", "sqlite"), help="backend the rollups follow")
+    args = parser.parse_args()
+
+    if args.rollups or args.start or args.end:
+        report = build_rollup_report(args.start, args.end, args.storage, args.site)
+    else:
+        path = storage_location("csv", args.site) if args.site else args.csv_path
+        report = build_report(path, args.chunk_size)
+    tables = report.tables(args.lang)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, table in tables.items():
+            table.to_csv(os.path.join(args.out, f"{name}.csv"), index=False)
+        print(f"Wrote {len(tables)} tables for {report.rows} responses to {args.out}")
+        return
+    print(f"{report.rows} responses\n")
+    for name, table in tables.items():
+        print(f"== {name} ==")
+        print(table.to_string(index=False))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import base64
+import hashlib
+import json
+import os
+import unicodedata
+from functools import lru_cache
+
+from country_index import COUNTRIES, TOP
+
+# Static startup data, loaded once per process and shared by every session.
+# Streamlit re-executes the entry scripts on each interaction, but imported
+# modules (and their caches) survive across reruns.
+
+LOGO_PATH = "logo.png"
+# Built by build_static.py, served by Streamlit at app/static/ when
+# server.enableStaticServing is on (.streamlit/config.toml).
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_MANIFEST = os.path.join(STATIC_DIR, "manifest.json")
+STATIC_URL = "app/static/"
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Norwegian alphabetical order: accents are ignored except on æ, ø and å,
+# which come after z (with ä and ö filed as æ and ø).
+_NORWEGIAN_LETTERS = str.maketrans({"æ": "{", "ä": "{", "ø": "|", "ö": "|", "å": "}"})
+
+
+def _norwegian_key(name):
+    name = unicodedata.normalize("NFKD", name.casefold().translate(_NORWEGIAN_LETTERS))
+    return "".join(char for char in name if not unicodedata.combining(char))
+
+
+# The TOP most frequent countries stay first; the rest are in the
+# alphabetical order of the labels the visitor sees.
+@lru_cache(maxsize=None)
+def country_names(lang="English"):
+    names = [english for english, _ in COUNTRIES]
+    if lang != "Norsk":
+        return tuple(names)
+    labels = _country_labels(lang)
+    return tuple(names[:TOP] + sorted(names[TOP:], key=lambda name: _norwegian_key(labels[name])))
+
+
+# The stored value is always the English name; Norsk visitors see (and can
+# type-ahead on) the Norwegian one.
+@lru_cache(maxsize=None)
+def _country_labels(lang):
+    if lang == "Norsk":
+        return {english: norwegian for english, norwegian in COUNTRIES}
+    return {english: english for english, _ in COUNTRIES}
+
+
+def country_labeller(lang):
+    labels = _country_labels(lang)
+    return lambda name: labels.get(name, name)
+
+
+# Keyed on the file signature, so replacing logo.png invalidates the entry.
+@lru_cache(maxsize=8)
+def _encode_file(path, signature):
+    if signature is None:
+        return ""
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+def load_logo_base64(path=LOGO_PATH):
+    return _encode_file(path, file_signature(path))
+
+
+@lru_cache(maxsize=4)
+def _static_manifest(path, signature):
+    if signature is None:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _static_serving():
+    import streamlit as st
+
+    return bool(st.get_option("server.enableStaticServing"))
+
+
+# Short content hash of an image, recorded in the manifest by build_static.py.
+@lru_cache(maxsize=8)
+def _source_hash(path, signature):
+    if signature is None:
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def source_hash(path):
+    return _source_hash(path, file_signature(path))
+
+
+@lru_cache(maxsize=32)
+def _image_attrs(path, width, manifest_signature, serving, signature):
+    entry = _static_manifest(STATIC_MANIFEST, manifest_signature).get(os.path.basename(path), {})
+    variants = entry.get("widths", {}).get(str(width))
+    # Variants built from an older version of the image are not served.
+    if serving and variants and entry.get("source") == _source_hash(path, signature):
+        srcset = ", ".join(f"{STATIC_URL}{name} {density}" for density, name in sorted(variants.items()))
+        return f"src='{STATIC_URL}{variants['1x']}' srcset='{srcset}' width='{width}'"
+    encoded = _encode_file(path, signature)
+    return f"src='data:image/png;base64,{encoded}' width='{width}'" if encoded else ""
+
+
+# <img> attributes for an image shown `width` px wide: the pre-resized,
+# content-hashed static files when they are built from the current image and
+# static serving is on, otherwise the original inlined as a data URI. Empty
+# if the image is missing.
+def image_attrs(path, width):
+    return _image_attrs(path, width, file_signature(STATIC_MANIFEST), _static_serving(), file_signature(path))
+
+
+def clear():
+    country_names.cache_clear()
+    _country_labels.cache_clear()
+    _encode_file.cache_clear()
+    _source_hash.cache_clear()
+    _static_manifest.cache_clear()
+    _image_attrs.cache_clear()
@@ -0,0 +1,333 @@
+import calendar
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from aggregates import COUNTED_FIELDS, ResetNeeded, open_tail
+from storage import MULTI_SELECT_FIELDS, SCORE_FIELDS, split_multi_select, storage_backend
+
+# Materialized daily and monthly summaries of the stored responses: per
+# bucket the number of responses, the count of every answer to every
+# question (language included) and the sum and count of each score. A
+# background updater folds newly stored rows in after every storage flush,
+# reading only what was stored since its last run (the storage tail's position
+# is saved with the rollups), and a report over any date range merges whole
+# months plus the days at either end instead of rescanning raw rows
+# (`python report.py --from 2024-06-01 --to 2024-08-31`).
+
+ROLLUP_NAME = "visitor_rollups.db"
+UPDATE_INTERVAL = 60.0
+CACHE_TTL = 30.0
+CACHE_ENTRIES = 2048
+PERIODS = ("day", "month")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS buckets (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counts (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, field, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    field TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket, field)
+) WITHOUT ROWID;
+"""
+
+
+def rollup_path(site=None):
+    if site is None:
+        return ROLLUP_NAME
+    from sites import site_config, site_dir
+
+    site_config(site)
+    return os.path.join(site_dir(site), ROLLUP_NAME)
+
+
+def _score(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# The totals of one bucket, or of several merged with +=.
+class Summary:
+    def __init__(self):
+        self.rows = 0
+        self.counts = {field: Counter() for field in COUNTED_FIELDS}
+        self.score_totals = Counter()
+        self.score_counts = Counter()
+
+    def __iadd__(self, other):
+        self.rows += other.rows
+        for field, counts in other.counts.items():
+            self.counts[field].update(counts)
+        self.score_totals.update(other.score_totals)
+        self.score_counts.update(other.score_counts)
+        return self
+
+    def add(self, row):
+        self.rows += 1
+        for field in COUNTED_FIELDS:
+            value = row.get(field)
+            if field in MULTI_SELECT_FIELDS:
+                self.counts[field].update(split_multi_select(value))
+            elif value not in (None, ""):
+                self.counts[field][str(value)] += 1
+        for field in SCORE_FIELDS:
+            score = _score(row.get(field))
+            if score is not None:
+                self.score_totals[field] += score
+                self.score_counts[field] += 1
+
+    def mean(self, field):
+        n = self.score_counts[field]
+        return round(self.score_totals[field] / n, 3) if n else None
+
+
+# Time- and size-bounded LRU of loaded buckets. The updater invalidates what
+# it changes; the TTL picks up updates made by other processes.
+class TTLCache:
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key, load):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = load()
+        with self.lock:
+            self.entries[key] = (now + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+class Rollups:
+    def __init__(self, path=ROLLUP_NAME, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.cache = TTLCache(ttl, max_entries)
+
+    # Folds in the rows stored since the previous update; returns how many.
+    # The tail position is saved in the same transaction as the totals, and
+    # the transaction is taken before the position is read, so concurrent
+    # updaters (in other processes too) never count a row twice.
+    def update(self, backend=None, site=None, tail=None):
+        backend = backend or storage_backend()
+        key = f"tail:{backend}"
+        tail = tail or open_tail(backend, site)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                if state is not None:
+                    tail.restore(json.loads(state[0]))
+                try:
+                    added = self._fold(tail)
+                except ResetNeeded:
+                    # The storage was replaced or truncated: rebuild from scratch.
+                    for table in ("buckets", "counts", "scores"):
+                        self.conn.execute(f"DELETE FROM {table}")
+                    tail = open_tail(backend, site)
+                    added = self._fold(tail)
+                    self.cache.clear()
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  (key, json.dumps(tail.state())))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _fold(self, tail):
+        summaries = {}
+        added = 0
+        for row in tail.read_new():
+            date = str(row.get("date") or "")
+            if not date:
+                continue
+            for bucket in (("day", date), ("month", date[:7])):
+                summaries.setdefault(bucket, Summary()).add(row)
+            added += 1
+        self.conn.executemany(
+            "INSERT INTO buckets (period, bucket, rows) VALUES (?, ?, ?) "
+            "ON CONFLICT (period, bucket) DO UPDATE SET rows = rows + excluded.rows",
+            [(period, bucket, summary.rows) for (period, bucket), summary in summaries.items()],
+        )
+        self.conn.executemany(
+            "INSERT INTO counts (period, bucket, field, value, n) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (period, bucket, field, value) DO UPDATE SET n = n + excluded.n",
+            [(period, bucket, field, value, n)
+             for (period, bucket), summary in summaries.items()
+             for field, counts in summary.counts.items() for value, n in counts.items()],
+        )
+        self.conn.executemany(
+            "INSERT INTO scores (period, bucket, field, total, n) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (period, bucket, field) DO UPDATE SET total = total + excluded.total, n = n + excluded.n",
+            [(period, bucket, field, summary.score_totals[field], n)
+             for (period, bucket), summary in summaries.items() for field, n in summary.score_counts.items()],
+        )
+        self.cache.invalidate([*summaries, *(("index", period) for period in PERIODS)])
+        return added
+
+    def _load(self, period, bucket):
+        summary = Summary()
+        with self.lock:
+            row = self.conn.execute("SELECT rows FROM buckets WHERE period = ? AND bucket = ?",
+                                    (period, bucket)).fetchone()
+            counts = self.conn.execute("SELECT field, value, n FROM counts WHERE period = ? AND bucket = ?",
+                                       (period, bucket)).fetchall()
+            scores = self.conn.execute("SELECT field, total, n FROM scores WHERE period = ? AND bucket = ?",
+                                       (period, bucket)).fetchall()
+        summary.rows = row[0] if row else 0
+        for field, value, n in counts:
+            summary.counts.setdefault(field, Counter())[value] = n
+        for field, total, n in scores:
+            summary.score_totals[field] = total
+            summary.score_counts[field] = n
+        return summary
+
+    def bucket(self, period, bucket):
+        return self.cache.get((period, bucket), lambda: self._load(period, bucket))
+
+    # Sorted bucket names of a period.
+    def buckets(self, period):
+        def load():
+            with self.lock:
+                return [bucket for bucket, in self.conn.execute(
+                    "SELECT bucket FROM buckets WHERE period = ? ORDER BY bucket", (period,))]
+
+        return self.cache.get(("index", period), load)
+
+    # The buckets covering [start, end] (ISO dates, inclusive; None for open
+    # ends): each month inside the range whole, the days of partial months.
+    def plan(self, start=None, end=None):
+        plan = []
+        days = [day for day in self.buckets("day") if (start is None or day >= start) and (end is None or day <= end)]
+        for month in self.buckets("month"):
+            year, number = int(month[:4]), int(month[5:7])
+            first, last = f"{month}-01", f"{month}-{calendar.monthrange(year, number)[1]:02d}"
+            if (start is None or start <= first) and (end is None or end >= last):
+                plan.append(("month", month))
+            else:
+                plan.extend(("day", day) for day in days if day.startswith(month))
+        return plan
+
+    def summary(self, start=None, end=None):
+        total = Summary()
+        for period, bucket in self.plan(start, end):
+            total += self.bucket(period, bucket)
+        return total
+
+    # One Summary per month touched by [start, end], trimmed to the range.
+    def monthly(self, start=None, end=None):
+        months = {}
+        for period, bucket in self.plan(start, end):
+            months.setdefault(bucket[:7], Summary())
+            months[bucket[:7]] += self.bucket(period, bucket)
+        return months
+
+    def close(self):
+        self.conn.close()
+
+
+# Runs Rollups.update() shortly after every storage flush (the writer's
+# listeners call wake()) and at least every `interval` seconds.
+class RollupUpdater(threading.Thread):
+    def __init__(self, rollups, backend=None, site=None, interval=UPDATE_INTERVAL):
+        super().__init__(name="rollup-updater", daemon=True)
+        self.rollups = rollups
+        self.backend = backend or storage_backend()
+        self.site = site
+        self.interval = interval
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+
+    def wake(self, rows=None):
+        self.wakeup.set()
+
+    def run(self):
+        import metrics
+
+        while not self.stopping.is_set():
+            try:
+                with metrics.timed("rollup_update_seconds"):
+                    self.rollups.update(self.backend, self.site)
+            except Exception as e:
+                print(f"rollups: update failed: {e!r}", file=sys.stderr)
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.wakeup.set()
+        self.join(timeout)
+
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+
+# The process-wide Rollups of a site, kept up to date after every flush of
+# `storage` (a BufferedWriter or LoggedStorage).
+def start_rollups(storage, backend=None, site=None):
+    import metrics
+
+    with _rollups_lock:
+        if site not in _rollups:
+            rollups = Rollups(rollup_path(site))
+            updater = RollupUpdater(rollups, backend, site)
+            updater.start()
+            metrics.register(f"rollup_cache_{site}" if site else "rollup_cache", rollups.cache.stats)
+            _rollups[site] = rollups, updater
+        rollups, updater = _rollups[site]
+    storage.listeners.append(updater.wake)
+    return rollups
@@ -0,0 +1,162 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from questions import OPTIONS, label
+from storage import CSV_PATH, SCORE_FIELDS, storage_location
+
+# Satisfaction scoring over the stored ratings. The 1-5 answers are held as
+# int8 arrays with MISSING for skipped questions, and every figure is computed
+# from per-score counts (np.bincount), so a million responses cost a few
+# array passes rather than a million Python calls.
+#
+#   csat      share of answers that are 4 or 5 (the top-2-box)
+#   top_box   share of 5s
+#   net       top-2-box minus bottom-2-box (1s and 2s), an NPS-style balance
+#   mean      mean score, with a bootstrap confidence interval
+#
+#     python scoring.py [visitor_data.csv] [--site oslo] [--segment country]
+
+MISSING = -1
+VALUES = np.arange(1, 6)
+SEGMENTS = ("country", "age", "lang")
+BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+CHUNK_SIZE = 500_000
+
+
+def _score(value):
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return MISSING
+    return int(score) if score in (1, 2, 3, 4, 5) else MISSING
+
+
+# "5".."1" (or 5..1) to int8; "", None and anything else to MISSING. A rating
+# column holds a handful of distinct values, so only those are parsed and the
+# column becomes a lookup into them.
+def parse_scores(values):
+    codes, uniques = pd.factorize(pd.Series(values))
+    table = np.array([_score(value) for value in uniques] + [MISSING], dtype=np.int8)
+    return table[codes]
+
+
+# Counts of 1..5 per segment code: shape (segments, 5).
+def score_counts(scores, codes=None, segments=1):
+    index = np.maximum(scores, 0).astype(np.int64)
+    if codes is not None:
+        index += codes.astype(np.int64) * 6
+    return np.bincount(index, minlength=segments * 6).reshape(segments, 6)[:, 1:]
+
+
+# The bootstrap distribution of a mean over 1..5 only depends on the counts:
+# resampling n answers with replacement is one multinomial draw.
+def bootstrap_means(counts, draws=BOOTSTRAP, seed=0):
+    answered = counts.sum(axis=-1)
+    shares = counts / np.maximum(answered, 1)[..., None]
+    samples = np.random.default_rng(seed).multinomial(answered, shares, size=(draws, *answered.shape))
+    return samples @ VALUES / np.maximum(answered, 1)
+
+
+def score_stats(counts, draws=BOOTSTRAP, confidence=CONFIDENCE, seed=0):
+    counts = np.atleast_2d(counts)
+    answered = counts.sum(axis=1)
+    safe = np.maximum(answered, 1)
+    means = bootstrap_means(counts, draws, seed)
+    tail = (1 - confidence) / 2
+    with np.errstate(invalid="ignore"):
+        stats = pd.DataFrame({
+            "answered": answered,
+            "mean": np.where(answered > 0, counts @ VALUES / safe, np.nan),
+            "mean_low": np.where(answered > 0, np.quantile(means, tail, axis=0), np.nan),
+            "mean_high": np.where(answered > 0, np.quantile(means, 1 - tail, axis=0), np.nan),
+            "csat": np.where(answered > 0, counts[:, 3:].sum(axis=1) / safe, np.nan),
+            "top_box": np.where(answered > 0, counts[:, 4] / safe, np.nan),
+            "net": np.where(answered > 0, (counts[:, 3:].sum(axis=1) - counts[:, :2].sum(axis=1)) / safe, np.nan),
+        })
+    return stats.round(4)
+
+
+class Scores:
+    # scores: {field: int8 array}; segments: {name: (int32 codes, labels)}
+    def __init__(self, scores, segments):
+        self.scores = scores
+        self.segments = segments
+        self.rows = len(next(iter(scores.values()))) if scores else 0
+
+    @classmethod
+    def from_frame(cls, frame):
+        scores = {field: parse_scores(frame[field]) for field in SCORE_FIELDS}
+        segments = {}
+        for name in SEGMENTS:
+            codes, labels = pd.factorize(frame[name].fillna(""), sort=True)
+            segments[name] = (codes.astype(np.int32), np.asarray(labels, dtype=object))
+        return cls(scores, segments)
+
+    @classmethod
+    def concat(cls, parts):
+        parts = list(parts)
+        if not parts:
+            return cls({field: np.empty(0, np.int8) for field in SCORE_FIELDS},
+                       {name: (np.empty(0, np.int32), np.empty(0, object)) for name in SEGMENTS})
+        if len(parts) == 1:
+            return parts[0]
+        scores = {field: np.concatenate([part.scores[field] for part in parts]) for field in SCORE_FIELDS}
+        segments = {}
+        for name in SEGMENTS:
+            labels = np.unique(np.concatenate([part.segments[name][1] for part in parts]).astype(str))
+            segments[name] = (np.concatenate([
+                np.searchsorted(labels, part.segments[name][1].astype(str))[part.segments[name][0]].astype(np.int32)
+                for part in parts
+            ]), labels.astype(object))
+        return cls(scores, segments)
+
+    # `path` is visitor_data.csv or a site's directory of daily CSV shards.
+    @classmethod
+    def load(cls, path=CSV_PATH, chunk_size=CHUNK_SIZE):
+        from report import iter_chunks
+
+        return cls.concat(cls.from_frame(chunk) for chunk in iter_chunks(path, chunk_size, SCORE_FIELDS + SEGMENTS))
+
+    def summary(self, draws=BOOTSTRAP, seed=0):
+        counts = np.vstack([score_counts(self.scores[field]) for field in SCORE_FIELDS])
+        stats = score_stats(counts, draws, seed=seed)
+        stats.insert(0, "question", SCORE_FIELDS)
+        return stats
+
+    # One row per value of `segment`, largest first; values with fewer than
+    # `min_answered` answers are left out.
+    def by(self, segment, field="satisfaction", min_answered=1, draws=BOOTSTRAP, seed=0, lang="English"):
+        codes, labels = self.segments[segment]
+        counts = score_counts(self.scores[field], codes, len(labels))
+        stats = score_stats(counts, draws, seed=seed)
+        names = [label(segment, value, lang) if segment in OPTIONS else value for value in labels]
+        stats.insert(0, segment, [name or "(none)" for name in names])
+        stats = stats[stats["answered"] >= min_answered]
+        return stats.sort_values("answered", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSAT, top-2-box and mean scores with bootstrap intervals")
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--site", help="score this site's shard only (overrides csv_path)")
+    parser.add_argument("--segment", choices=SEGMENTS, action="append", help="break down by this column")
+    parser.add_argument("--field", choices=SCORE_FIELDS, default="satisfaction", help="score to break down")
+    parser.add_argument("--min-answered", type=int, default=20)
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP, help="bootstrap resamples")
+    parser.add_argument("--lang", default="English", help="label language for option codes")
+    args = parser.parse_args()
+
+    path = storage_location("csv", args.site) if args.site else args.csv_path
+    scores = Scores.load(path)
+    print(f"{scores.rows} responses\n")
+    print(scores.summary(args.bootstrap).to_string(index=False))
+    for segment in args.segment or ():
+        print(f"\n== {args.field} by {segment} ==")
+        print(scores.by(segment, args.field, args.min_answered, args.bootstrap, lang=args.lang).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
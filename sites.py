@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from resources import file_signature
+
+# Multi-site mode: the same forms running at several locations or
+# exhibitions. A kiosk picks its site with ?site=<id> in the URL, or the
+# whole server with `-- --site <id>` or VISITOR_SITE. Without a site the
+# forms behave as a single installation and keep the original file names.
+#
+# Sites must be listed in sites.json, so a hand-edited URL cannot create new
+# shards on disk:
+#
+#     {"sites": {"oslo": {"name": "...",
+#                         "google_form": {"trial": {"English": {"url": "...", "fields": {...}},
+#                                                   "Norsk": {...}}}}}}
+#
+# google_form is optional and replaces, per form variant and language, the
+# endpoints from form_schema.json.
+
+SITES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites.json")
+SITES_ROOT = "sites"
+SITE_ID = re.compile(r"[a-z0-9][a-z0-9_-]{0,31}")
+
+
+@lru_cache(maxsize=4)
+def _load(path, signature):
+    if signature is None:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("sites", {})
+
+
+def load_sites(path=SITES_PATH):
+    return _load(path, file_signature(path))
+
+
+def site_config(site, path=SITES_PATH):
+    if site is None:
+        return {}
+    sites = load_sites(path)
+    if not SITE_ID.fullmatch(site) or site not in sites:
+        raise ValueError(f"Unknown site {site!r}, expected one of {sorted(sites)}")
+    return sites[site]
+
+
+def configured_site(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--site")
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args.site or os.environ.get("VISITOR_SITE") or None
+
+
+# The site for the current Streamlit session; stops the script run with an
+# error for sites that are not configured.
+def current_site():
+    import streamlit as st
+
+    site = st.query_params.get("site") or configured_site()
+    try:
+        site_config(site)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    return site
+
+
+# Each site writes to its own directory: CSV is further split into one file
+# per day, Parquet into date= partitions, SQLite is one database per site.
+def site_dir(site, root=SITES_ROOT):
+    return os.path.join(root, site)
+
+
+def shard_path(site, backend, root=SITES_ROOT):
+    site_config(site)
+    directory = site_dir(site, root)
+    if backend == "csv":
+        return os.path.join(directory, "csv")
+    if backend == "parquet":
+        return os.path.join(directory, "parquet")
+    return os.path.join(directory, "visitor_data.db")
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+from storage import (BufferedWriter, MULTI_SELECT_FIELDS, MULTI_SELECT_SEPARATOR, SCORE_FIELDS, SQLITE_PATH, VISITOR_FIELDS,
+                     row_key)
+
+# SQLite storage for visitor responses. WAL mode lets several kiosk processes
+# on one host write concurrently while readers keep going, and the indexes on
+# date, lang and country keep range and per-country lookups off full scans.
+
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    lang TEXT,
+    country TEXT,
+    info_source TEXT,
+    gender TEXT,
+    age TEXT,
+    enjoyed TEXT,
+    satisfaction INTEGER,
+    staff INTEGER,
+    cleanliness INTEGER,
+    purchase_factors TEXT,
+    association TEXT,
+    improvement TEXT
+);
+CREATE INDEX IF NOT EXISTS responses_date ON responses (date);
+CREATE INDEX IF NOT EXISTS responses_lang ON responses (lang, date);
+CREATE INDEX IF NOT EXISTS responses_country ON responses (country, date);
+"""
+
+INSERT = "INSERT INTO responses ({}) VALUES ({})".format(
+    ", ".join(VISITOR_FIELDS), ", ".join("?" * len(VISITOR_FIELDS))
+)
+
+
+def connect(path=SQLITE_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def to_params(row):
+    params = []
+    for field in VISITOR_FIELDS:
+        value = row.get(field)
+        if field in MULTI_SELECT_FIELDS and isinstance(value, (list, tuple)):
+            value = MULTI_SELECT_SEPARATOR.join(value)
+        elif field in SCORE_FIELDS:
+            value = int(value) if value not in (None, "") else None
+        params.append(value)
+    return params
+
+
+class SQLiteWriter(BufferedWriter):
+    def __init__(self, path=SQLITE_PATH, batch_size=20, flush_interval=5.0):
+        self.path = path
+        self.conn = connect(path)
+        super().__init__(batch_size, flush_interval)
+
+    def write_rows(self, rows):
+        with self.conn:
+            self.conn.executemany(INSERT, [to_params(row) for row in rows])
+
+    def position(self, rows):
+        return {"id": self.conn.execute("SELECT MAX(id) FROM responses").fetchone()[0] or 0}
+
+    def stored_after(self, rows, position):
+        if position is None:
+            return Counter()
+        cursor = self.conn.execute(f"SELECT {', '.join(VISITOR_FIELDS)} FROM responses WHERE id > ?", (position["id"],))
+        return Counter(row_key(dict(zip(VISITOR_FIELDS, values))) for values in cursor)
+
+    # NORMAL only syncs at WAL checkpoints; FULL syncs every commit.
+    def make_durable(self):
+        super().make_durable()
+        self.conn.execute("PRAGMA synchronous=FULL")
+
+
+class ResponseQueries:
+    def __init__(self, path=SQLITE_PATH):
+        self.conn = connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+
+    def _where(self, start, end, country, lang):
+        clauses, params = [], []
+        for column, op, value in (("date", ">=", start), ("date", "<=", end), ("country", "=", country), ("lang", "=", lang)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def responses(self, start=None, end=None, country=None, lang=None):
+        where, params = self._where(start, end, country, lang)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(f"SELECT * FROM responses{where} ORDER BY date, time", params)]
+
+    def count_by(self, column, start=None, end=None, country=None, lang=None):
+        if column not in VISITOR_FIELDS:
+            raise ValueError(f"Unknown column {column!r}")
+        where, params = self._where(start, end, country, lang)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {column}, COUNT(*) FROM responses{where} GROUP BY {column} ORDER BY 2 DESC", params)
+            return dict(rows.fetchall())
@@ -0,0 +1,68 @@
+import os
+import sys
+
+# Staff-only app, kept out of pages/ so it is not in the navigation of the
+# public kiosk and QR-code forms. Run it separately from the repository root,
+# on a port only staff can reach:
+#
+#     streamlit run staff/dashboard.py --server.port 8502 [-- --site oslo]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+import pandas as pd
+from functools import partial
+from aggregates import RunningAggregates, open_tail
+from questions import OPTIONS, label
+from sites import current_site
+from storage import SCORE_FIELDS
+
+st.set_page_config(page_title="Salmon Visitor Dashboard", layout="wide")
+
+@st.cache_resource
+def get_aggregates(site):
+    return RunningAggregates(partial(open_tail, site=site))
+
+def counts_frame(field, top=None):
+    counts = aggregates.counts[field].most_common(top)
+    if field in OPTIONS:
+        counts = [(label(field, code), n) for code, n in counts]
+    return pd.DataFrame(counts, columns=[field, "visitors"]).set_index(field)
+
+site = current_site()
+aggregates = get_aggregates(site)
+aggregates.refresh()
+
+st.title("📊 Visitor dashboard" + (f" – {site}" if site else ""))
+if st.button("Recount from scratch"):
+    with aggregates.lock:
+        aggregates.reset()
+    aggregates.refresh()
+
+if not aggregates.total:
+    st.info("No responses stored yet.")
+    st.stop()
+
+st.metric("Responses", aggregates.total)
+
+st.subheader("Daily responses")
+daily = pd.DataFrame(sorted(aggregates.daily.items()), columns=["date", "visitors"]).set_index("date")
+st.line_chart(daily)
+
+left, right = st.columns(2)
+with left:
+    st.subheader("Country (top 15)")
+    st.bar_chart(counts_frame("country", 15), horizontal=True)
+    st.subheader("Age")
+    st.bar_chart(counts_frame("age"))
+with right:
+    st.subheader("How did you hear about us?")
+    st.bar_chart(counts_frame("info_source"))
+    st.subheader("Enjoyed the most")
+    st.bar_chart(counts_frame("enjoyed"))
+
+st.subheader("Scores")
+scores = pd.DataFrame(
+    {field: [aggregates.counts[field].get(score, 0) for score in ("1", "2", "3", "4", "5")] for field in SCORE_FIELDS},
+    index=["1", "2", "3", "4", "5"],
+)
+st.bar_chart(scores, stack=False)
@@ -0,0 +1,164 @@
+import argparse
+import atexit
+import os
+import sys
+import threading
+from collections import Counter
+
+import metrics
+
+# Storage backends for visitor responses. Every backend buffers rows from all
+# sessions in the server process and writes them in batches under one lock;
+# subclasses only implement write_rows(). Listeners are called after every
+# batch is written (see rollups.py).
+
+VISITOR_FIELDS = [
+    "date", "time", "lang", "country", "info_source", "gender", "age", "enjoyed",
+    "satisfaction", "staff", "cleanliness", "purchase_factors", "association", "improvement",
+]
+MULTI_SELECT_FIELDS = ("purchase_factors", "association")
+SCORE_FIELDS = ("satisfaction", "staff", "cleanliness")
+MULTI_SELECT_SEPARATOR = ", "
+
+CSV_PATH = "visitor_data.csv"
+PARQUET_ROOT = "visitor_data_parquet"
+SQLITE_PATH = "visitor_data.db"
+BACKENDS = ("csv", "parquet", "sqlite")
+
+
+class BufferedWriter:
+    def __init__(self, batch_size=20, flush_interval=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.rows = []
+        self.listeners = []
+        self.durable = False
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_periodically, name="storage-flusher", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def append(self, row):
+        with self.lock:
+            self.rows.append(row)
+            if len(self.rows) >= self.batch_size:
+                self._write_locked()
+
+    def flush(self):
+        with self.lock:
+            self._write_locked()
+
+    def _write_locked(self):
+        if not self.rows:
+            return
+        with metrics.timed("storage_write_seconds", backend=type(self).__name__):
+            self.write_rows(self.rows)
+        metrics.count("stored_rows_total", len(self.rows), backend=type(self).__name__)
+        self.notify(self.rows)
+        self.rows = []
+
+    def notify(self, rows):
+        for listener in self.listeners:
+            listener(rows)
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    # From now on write_rows() only returns once the rows are on disk (the
+    # WAL compactor checkpoints past them right after).
+    def make_durable(self):
+        self.durable = True
+
+    # Where the files that `rows` go to end, saved with a checkpoint; after a
+    # crash, repair() cuts off what a write torn mid-way left past there and
+    # returns the bytes dropped. Backends with atomic writes need neither.
+    def position(self, rows):
+        return None
+
+    def repair(self, rows, position):
+        return 0
+
+    # Counter of row_key() of the rows stored past `position` where `rows`
+    # go, so a batch written again after a crash skips what already landed.
+    # Empty when the backend cannot tell.
+    def stored_after(self, rows, position):
+        return Counter()
+
+    def _flush_periodically(self):
+        while not self.closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # The rows stay buffered and are tried again next interval.
+                print(f"storage: flush failed: {e!r}", file=sys.stderr)
+                metrics.count("storage_flush_errors_total", backend=type(self).__name__)
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        self.flush()
+
+
+# Makes a file created or renamed in the directory of `path` survive a crash.
+def fsync_directory(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# A stored row as comparable strings, whichever backend it was read from.
+def row_key(row):
+    values = []
+    for field in VISITOR_FIELDS:
+        value = row.get(field)
+        if isinstance(value, (list, tuple)):
+            value = MULTI_SELECT_SEPARATOR.join(value)
+        values.append("" if value is None else str(value))
+    return tuple(values)
+
+
+def split_multi_select(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not value:
+        return []
+    return value.split(MULTI_SELECT_SEPARATOR)
+
+
+# Backend selection: `streamlit run besøk.py -- --storage sqlite`, or the
+# VISITOR_STORAGE environment variable. Defaults to csv.
+def storage_backend(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--storage")
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args.storage or os.environ.get("VISITOR_STORAGE", "csv")
+
+
+# Where a backend keeps its data: the original single-site files, or the
+# site's own shard (see sites.py).
+def storage_location(backend, site=None):
+    if site is not None:
+        from sites import shard_path
+        return shard_path(site, backend)
+    return {"csv": CSV_PATH, "parquet": PARQUET_ROOT, "sqlite": SQLITE_PATH}[backend]
+
+
+def open_storage(backend=None, site=None):
+    backend = backend or storage_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {BACKENDS}")
+    location = storage_location(backend, site)
+    if backend == "csv":
+        from csv_writer import BufferedCSVWriter, ShardedCSVWriter
+        return ShardedCSVWriter(location) if site else BufferedCSVWriter(location)
+    if backend == "parquet":
+        from parquet_store import ParquetWriter
+        return ParquetWriter(location)
+    from sqlite_store import SQLiteWriter
+    return SQLiteWriter(location)
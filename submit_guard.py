@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# In-process guard in front of the submit path. A submission is dropped
+# before any storage write or form POST when
+#   - the same session sent the same answers within DUPLICATE_WINDOW seconds
+#     (a double tap on the submit button), or
+#   - its session or its kiosk is out of tokens (a visitor hammering the
+#     button, or a runaway kiosk).
+# Sessions and fingerprints live in bounded LRUs, so memory stays constant
+# however long the kiosk runs.
+#
+#     reason = submit_guard.check(session_id, kiosk, answers, lang)
+#     if reason is None: store and send; elif reason == "duplicate": thank
+#     the visitor anyway; else ask them to wait.
+
+# One submission per SESSION_INTERVAL seconds per session, bursts of SESSION_BURST.
+SESSION_INTERVAL = 5.0
+SESSION_BURST = 2
+# A kiosk serves one visitor at a time; this only stops floods.
+KIOSK_INTERVAL = 1.0
+KIOSK_BURST = 10
+# Shorter than a kiosk turnover (the reset delay plus filling in the form),
+# since a reset keeps the browser session.
+DUPLICATE_WINDOW = 10.0
+MAX_SESSIONS = 1024
+MAX_FINGERPRINTS = 4096
+
+
+class TokenBucket:
+    __slots__ = ("interval", "burst", "tokens", "stamp")
+
+    def __init__(self, interval, burst, now):
+        self.interval = interval
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) / self.interval)
+        self.stamp = now
+        return self.tokens >= 1
+
+
+def fingerprint(session_id, answers, lang):
+    text = repr((session_id, lang, sorted(answers.items())))
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+
+class SubmitGuard:
+    def __init__(self, session_interval=SESSION_INTERVAL, session_burst=SESSION_BURST,
+                 kiosk_interval=KIOSK_INTERVAL, kiosk_burst=KIOSK_BURST,
+                 duplicate_window=DUPLICATE_WINDOW, max_sessions=MAX_SESSIONS,
+                 max_fingerprints=MAX_FINGERPRINTS):
+        self.session_limit = (session_interval, session_burst)
+        self.kiosk_limit = (kiosk_interval, kiosk_burst)
+        self.duplicate_window = duplicate_window
+        self.max_sessions = max_sessions
+        self.max_fingerprints = max_fingerprints
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()
+        self.kiosks = OrderedDict()
+        self.fingerprints = OrderedDict()
+        self.rejected = {}
+
+    def _bucket(self, buckets, key, limit, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(*limit, now)
+            if len(buckets) > self.max_sessions:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    # Returns None if the submission may go ahead (and records it), else the
+    # reason it was rejected: "duplicate", "session_rate" or "kiosk_rate".
+    def check(self, session_id, kiosk, answers, lang, now=None):
+        now = time.monotonic() if now is None else now
+        key = fingerprint(session_id, answers, lang)
+        with self.lock:
+            seen = self.fingerprints.get(key)
+            if seen is not None and now - seen < self.duplicate_window:
+                reason = "duplicate"
+            else:
+                session = self._bucket(self.sessions, session_id, self.session_limit, now)
+                station = self._bucket(self.kiosks, kiosk, self.kiosk_limit, now)
+                if not session.refill(now):
+                    reason = "session_rate"
+                elif not station.refill(now):
+                    reason = "kiosk_rate"
+                else:
+                    session.tokens -= 1
+                    station.tokens -= 1
+                    self.fingerprints[key] = now
+                    self.fingerprints.move_to_end(key)
+                    if len(self.fingerprints) > self.max_fingerprints:
+                        self.fingerprints.popitem(last=False)
+                    return None
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.count("submissions_rejected_total", reason=reason)
+        return reason
+
+    def stats(self):
+        with self.lock:
+            return {"sessions": len(self.sessions), "fingerprints": len(self.fingerprints),
+                    **{f"rejected_{reason}": n for reason, n in self.rejected.items()}}
+
+
+GUARD = SubmitGuard()
+check = GUARD.check
+metrics.register("submit_guard", GUARD.stats)
+
+
+# The Streamlit session of the running script, or "" outside a server.
+def session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else ""
+
+
+# The kiosk is told apart by its address (st.context.ip_address needs
+# Streamlit 1.45; older versions, and localhost, share one bucket).
+def kiosk_id():
+    import streamlit as st
+
+    return getattr(st.context, "ip_address", None) or "local"
@@ -0,0 +1,276 @@
+import argparse
+import json
+import re
+import sqlite3
+import unicodedata
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from aggregates import ResetNeeded, open_tail
+from storage import storage_backend
+
+# Offline analysis of the free-text "improvement" answers: keyword and bigram
+# frequencies per language and clusters of near-duplicate answers, kept in a
+# SQLite index. Each run reads only the responses stored since the previous
+# run (the storage tail's position is saved in the index), so a nightly
+# update costs the same whether the history holds a month or five years.
+# Terms and answers are kept per source (a site's storage tail), so sites can
+# be updated on their own schedules and one site's rebuild leaves the others.
+#
+#     python text_analytics.py [--site oslo] [--top 20]
+
+INDEX_PATH = "improvement_index.db"
+LANGUAGES = ("English", "Norsk")
+
+STOPWORDS = {
+    "English": frozenset("""
+        a about all also an and any are as at be been but by can could do does for from get had has have
+        i if in into is it its just like more most much my no not of on or our please so some than that
+        the their them there they this to too very was we were what when which while will with would you
+        your me less bit lot really maybe should""".split()),
+    "Norsk": frozenset("""
+        alle at av bare ble bli blir de dem den der det dere deres disse du eller en er et etter for fra
+        gjerne ha hadde han har hun i ikke jeg kan kanskje kunne man med meg men mer mest mye min mitt når
+        og også om på sa seg selv sin skal slik som så til ut var vi vil ville være veldig litt bør""".split()),
+}
+TOKEN = re.compile(r"[^\W\d_]+(?:[-'][^\W\d_]+)*")
+NORWEGIAN_LETTERS = re.compile("[æøå]")
+
+SHINGLE = 5
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SIMILARITY = 0.6
+# Representatives kept per LSH bucket. Candidates per lookup are bounded by
+# BANDS * BUCKET_CAP however many distinct answers the index holds.
+BUCKET_CAP = 8
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.int64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS terms (
+    source TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (source, lang, n, term)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    date TEXT,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    cluster INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_cluster ON docs (cluster);
+CREATE INDEX IF NOT EXISTS docs_source ON docs (source);
+CREATE TABLE IF NOT EXISTS bands (source TEXT NOT NULL, bucket INTEGER NOT NULL, doc INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS bands_bucket ON bands (source, bucket);
+"""
+
+
+def normalize(text):
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+# The language of the answer itself (visitors do not always write in the form
+# language), judged by stopwords and Norwegian letters; the form language
+# breaks ties.
+def detect_language(words, form_lang="English"):
+    scores = {lang: sum(word in STOPWORDS[lang] for word in words) for lang in LANGUAGES}
+    if any(NORWEGIAN_LETTERS.search(word) for word in words):
+        scores["Norsk"] += 2
+    best = max(scores.values())
+    if scores.get(form_lang) == best:
+        return form_lang
+    return max(scores, key=scores.get)
+
+
+def tokenize(text, lang):
+    return [word for word in TOKEN.findall(text) if word not in STOPWORDS[lang] and len(word) > 1]
+
+
+def ngrams(tokens, n):
+    return [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+
+def signature(text):
+    padded = f" {text} "
+    shingles = {padded[i:i + SHINGLE] for i in range(max(1, len(padded) - SHINGLE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode()) & _PRIME for s in shingles), dtype=np.int64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.int32)
+
+
+# One LSH bucket key per band, with the band number in the high bits.
+def band_buckets(sig):
+    data = sig.tobytes()
+    step = ROWS_PER_BAND * 4
+    return [band << 32 | zlib.crc32(data[band * step:(band + 1) * step]) for band in range(BANDS)]
+
+
+def source_key(backend=None, site=None):
+    return f"tail:{backend or storage_backend()}:{site or ''}"
+
+
+class TextIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(terms)")]
+        if columns and "source" not in columns:
+            # An index from before sources were kept apart: it is derived
+            # data, so drop it and let the next update rebuild it.
+            with self.conn:
+                for table in ("terms", "docs", "bands", "meta"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.executescript(SCHEMA)
+
+    def tail_state(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Indexes the answers stored since the previous run; returns how many
+    # rows were read and how many had text.
+    def update(self, backend=None, site=None):
+        backend = backend or storage_backend()
+        return self.consume(open_tail(backend, site), source_key(backend, site), lambda: open_tail(backend, site))
+
+    # Same, for any storage tail; its position is saved under `key`, which
+    # also names the source its terms and answers are kept under. `reopen`
+    # returns a fresh tail for when the storage was replaced.
+    def consume(self, tail, key, reopen=None):
+        state = self.tail_state(key)
+        if state is not None:
+            tail.restore(state)
+        with self.conn:
+            try:
+                read, indexed = self._index(tail, key)
+            except ResetNeeded:
+                if reopen is None:
+                    raise
+                # The storage was replaced or truncated (a migration or an
+                # import): rebuild this source from scratch. Other sources
+                # keep their terms, answers and tail positions.
+                for table in ("terms", "docs", "bands"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE source = ?", (key,))
+                tail = reopen()
+                read, indexed = self._index(tail, key)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                              (key, json.dumps(tail.state())))
+        return read, indexed
+
+    def _index(self, tail, source):
+        terms = Counter()
+        read = indexed = 0
+        for row in tail.read_new():
+            read += 1
+            text = normalize(row.get("improvement") or "")
+            if not text:
+                continue
+            indexed += 1
+            words = TOKEN.findall(text)
+            lang = detect_language(words, row.get("lang") or "English")
+            tokens = tokenize(text, lang)
+            terms.update((lang, 1, term) for term in tokens)
+            terms.update((lang, 2, term) for term in ngrams(tokens, 2))
+            self.add_doc(source, row.get("date"), lang, text)
+        self.conn.executemany(
+            "INSERT INTO terms (source, lang, n, term, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, lang, n, term) DO UPDATE SET count = count + excluded.count",
+            [(source, lang, n, term, count) for (lang, n, term), count in terms.items()],
+        )
+        return read, indexed
+
+    # Stores the answer and joins it to every cluster whose representative (the
+    # first answer of the cluster) in the same source has an estimated similarity of SIMILARITY
+    # or more, merging clusters it bridges. Only representatives go into the
+    # LSH buckets, so a lookup costs the same after a thousand copies of
+    # "more seating" as after one.
+    def add_doc(self, source, date, lang, text):
+        sig = signature(text)
+        buckets = band_buckets(sig)
+        rows = self.conn.execute(
+            f"SELECT signature, cluster FROM docs WHERE id IN "
+            f"(SELECT doc FROM bands WHERE source = ? AND bucket IN ({','.join('?' * len(buckets))}))",
+            [source, *buckets]).fetchall()
+        clusters = set()
+        if rows:
+            sigs = np.frombuffer(b"".join(blob for blob, _ in rows), dtype=np.int32).reshape(len(rows), NUM_HASHES)
+            similarity = (sigs == sig).mean(axis=1)
+            clusters = {cluster for (_, cluster), s in zip(rows, similarity) if s >= SIMILARITY}
+        doc = self.conn.execute(
+            "INSERT INTO docs (source, date, lang, text, signature, cluster) VALUES (?, ?, ?, ?, ?, -1)",
+            (source, date, lang, text, sig.tobytes()),
+        ).lastrowid
+        cluster = min(clusters | {doc})
+        self.conn.execute("UPDATE docs SET cluster = ? WHERE id = ?", (cluster, doc))
+        if len(clusters) > 1:
+            others = sorted(clusters - {cluster})
+            self.conn.execute(f"UPDATE docs SET cluster = ? WHERE cluster IN ({','.join('?' * len(others))})",
+                              [cluster, *others])
+        if not clusters:
+            self.conn.executemany(
+                "INSERT INTO bands (source, bucket, doc) SELECT ?, ?, ? "
+                "WHERE (SELECT COUNT(*) FROM bands WHERE source = ? AND bucket = ?) < ?",
+                [(source, bucket, doc, source, bucket, BUCKET_CAP) for bucket in buckets],
+            )
+
+    # Over every source unless `source` is given.
+    def top_terms(self, lang, n=1, limit=20, source=None):
+        return self.conn.execute(
+            "SELECT term, SUM(count) AS total FROM terms WHERE lang = ? AND n = ? AND ? IN (source, '') "
+            "GROUP BY term ORDER BY total DESC, term LIMIT ?",
+            (lang, n, source or "", limit),
+        ).fetchall()
+
+    # Largest clusters as (size, representative answer, languages).
+    def clusters(self, min_size=2, limit=20, source=None):
+        return self.conn.execute(
+            "SELECT COUNT(*) AS size, (SELECT text FROM docs WHERE id = d.cluster), GROUP_CONCAT(DISTINCT lang) "
+            "FROM docs d WHERE ? IN (source, '') GROUP BY cluster HAVING size >= ? ORDER BY size DESC LIMIT ?",
+            (source or "", min_size, limit),
+        ).fetchall()
+
+    def size(self, source=None):
+        return self.conn.execute("SELECT COUNT(*) FROM docs WHERE ? IN (source, '')", (source or "",)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keywords and near-duplicate clusters of the improvement answers")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--storage", choices=("csv", "parquet", "sqlite"))
+    parser.add_argument("--site")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-cluster", type=int, default=3)
+    args = parser.parse_args()
+
+    index = TextIndex(args.index)
+    read, indexed = index.update(args.storage, args.site)
+    # Reports cover the --site given, or every source without one.
+    source = source_key(args.storage, args.site) if args.site else None
+    print(f"Read {read} new responses, indexed {indexed} answers ({index.size(source)} in {args.index})\n")
+    for lang in LANGUAGES:
+        for n, title in ((1, "keywords"), (2, "bigrams")):
+            terms = index.top_terms(lang, n, args.top, source)
+            if terms:
+                print(f"== {lang} {title} ==")
+                print("\n".join(f"{count:7d}  {term}" for term, count in terms))
+                print()
+    print("== Similar answers ==")
+    for size, text, langs in index.clusters(args.min_cluster, args.top, source):
+        print(f"{size:7d}  {text[:80]}  ({langs})")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
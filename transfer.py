@@ -0,0 +1,341 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+
+from aggregates import open_tail
+from csv_writer import to_csv_row
+from questions import LANGUAGES, OPTIONS, SCORES, to_code
+from storage import MULTI_SELECT_FIELDS, SCORE_FIELDS, VISITOR_FIELDS, open_storage, split_multi_select, storage_backend
+
+# Bulk export and import of visitor responses.
+#
+#     python transfer.py export responses.jsonl --site oslo --from 2024-01-01 --lang Norsk
+#     python transfer.py import responses.jsonl --storage sqlite
+#     python transfer.py import trial_form.csv --google-form trial
+#
+# Exports stream rows from any storage backend to CSV, JSONL or Parquet (the
+# format follows the file name; .csv.gz and .jsonl.gz are gzipped). Imports
+# read the same formats, or a CSV downloaded from a Google Form's responses,
+# in chunks that worker processes validate against form_schema.json and
+# normalize to option codes. Rows already in the target storage, or repeated
+# in the input, are skipped, so an import can be rerun safely.
+
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_SIZE = 20_000
+# The main process reads, deduplicates and writes while workers validate.
+WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1))
+MAX_ERRORS = 20
+TIME = re.compile(r"([01]\d|2[0-3]):[0-5]\d:[0-5]\d")
+TIMESTAMP_FORMATS = ("%Y/%m/%d %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%d.%m.%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+
+def file_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path!r}; pass --format ({', '.join(FORMATS)})")
+    return extension
+
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8")
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+# A stored row with scores as ints, multi-selects as lists and every field
+# present, whichever backend it came from.
+def canonical(row):
+    result = {}
+    for field in VISITOR_FIELDS:
+        value = row.get(field)
+        if field in SCORE_FIELDS:
+            value = int(value) if value not in (None, "") else None
+        elif field in MULTI_SELECT_FIELDS:
+            value = split_multi_select(value)
+        elif value is not None:
+            value = str(value)
+        result[field] = value
+    return result
+
+
+def fingerprint(row):
+    parts = []
+    for field in VISITOR_FIELDS:
+        value = row[field]
+        parts.append("\x1e".join(value) if isinstance(value, list) else "" if value is None else str(value))
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).digest()
+
+
+def select(rows, start=None, end=None, lang=None):
+    for row in rows:
+        day = str(row.get("date") or "")
+        if (start and day < start) or (end and day > end) or (lang and row.get("lang") != lang):
+            continue
+        yield canonical(row)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_rows(rows, path, fmt=None, compression="zstd"):
+    fmt = file_format(path, fmt)
+    exported = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        from parquet_store import SCHEMA, to_table
+
+        schema = pa.schema([("date", pa.string()), *SCHEMA])
+        with pq.ParquetWriter(path, schema, compression=compression) as writer:
+            for batch in _batches(rows, CHUNK_SIZE):
+                table = to_table(batch).add_column(0, "date", pa.array([row["date"] for row in batch], pa.string()))
+                writer.write_table(table)
+                exported += len(batch)
+        return exported
+    with _open_text(path, "w") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=VISITOR_FIELDS, lineterminator="\n")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(to_csv_row(row))
+                exported += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                exported += 1
+    return exported
+
+
+def export(path, backend=None, site=None, start=None, end=None, lang=None, fmt=None, compression="zstd"):
+    rows = open_tail(backend or storage_backend(), site).read_new()
+    return export_rows(select(rows, start, end, lang), path, fmt, compression)
+
+
+# Input rows in lists of `size`.
+def read_chunks(path, fmt=None, size=CHUNK_SIZE):
+    fmt = file_format(path, fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=size):
+            yield batch.to_pylist()
+        return
+    with _open_text(path, "r") as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        yield from _batches(rows, size)
+
+
+# Column titles of a Google Form's response export -> (question id, language).
+@lru_cache(maxsize=None)
+def google_form_columns(variant):
+    from form_schema import compiled_form
+
+    form = compiled_form(variant)
+    return {question.prompt: (question.id, lang) for lang in form.languages for question in form.questions(lang)}
+
+
+def _timestamp(value):
+    value = value.split(" GMT")[0].strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"unreadable timestamp {value!r}")
+
+
+def _from_google_form(row, columns):
+    result = {}
+    for title, value in row.items():
+        if title == "Timestamp":
+            stamp = _timestamp(value)
+            result["date"], result["time"] = stamp.strftime("%Y-%m-%d"), stamp.strftime("%H:%M:%S")
+        elif title in columns:
+            question, lang = columns[title]
+            result[question] = value
+            result.setdefault("lang", lang)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _countries():
+    from resources import COUNTRIES
+
+    return {name: english for english, norwegian in COUNTRIES for name in (english, norwegian)}
+
+
+# Returns the row normalized to stored form; raises ValueError naming the
+# first field that does not fit form_schema.json.
+def validate(row):
+    for field in SCORE_FIELDS:
+        if row.get(field) not in (None, "") and str(row[field]) not in SCORES:
+            raise ValueError(f"{field}: {row[field]!r} is not a 1-5 score")
+    row = canonical(row)
+    if not row["date"]:
+        raise ValueError("date: missing")
+    try:
+        row["date"] = date.fromisoformat(row["date"]).isoformat()
+    except ValueError:
+        raise ValueError(f"date: {row['date']!r} is not YYYY-MM-DD") from None
+    if not TIME.fullmatch(row["time"] or ""):
+        raise ValueError(f"time: {row['time']!r} is not HH:MM:SS")
+    if row["lang"] not in LANGUAGES:
+        raise ValueError(f"lang: {row['lang']!r} is not one of {', '.join(LANGUAGES)}")
+    if row["country"]:
+        country = _countries().get(row["country"])
+        if country is None:
+            raise ValueError(f"country: unknown {row['country']!r}")
+        row["country"] = country
+    for question in OPTIONS:
+        values = row[question] if question in MULTI_SELECT_FIELDS else [row[question]] if row[question] else []
+        codes = []
+        for value in values:
+            code = to_code(question, value)
+            if code is None:
+                raise ValueError(f"{question}: unknown option {value!r}")
+            codes.append(code)
+        row[question] = codes if question in MULTI_SELECT_FIELDS else (codes[0] if codes else None)
+    row["improvement"] = row["improvement"] or ""
+    return row
+
+
+# Worker side of an import: (valid rows, their fingerprints, [(row number, error)]).
+def validate_chunk(rows, first, google_form=None):
+    columns = google_form_columns(google_form) if google_form else None
+    valid, fingerprints, errors = [], [], []
+    for number, row in enumerate(rows, first):
+        try:
+            row = validate(_from_google_form(row, columns) if columns else row)
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        valid.append(row)
+        fingerprints.append(fingerprint(row))
+    return valid, fingerprints, errors
+
+
+# With a single worker, shipping chunks to another process costs more than
+# validating them in place.
+class _InlineExecutor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class ImportResult:
+    def __init__(self):
+        self.read = self.imported = self.duplicates = self.invalid = 0
+        self.errors = []
+
+
+def import_rows(path, backend=None, site=None, fmt=None, google_form=None, workers=WORKERS,
+                chunk_size=CHUNK_SIZE, dry_run=False):
+    backend = backend or storage_backend()
+    # Everything already stored, so a rerun or an overlapping export adds nothing.
+    seen = {fingerprint(canonical(row)) for row in open_tail(backend, site).read_new()}
+    writer = None if dry_run else open_storage(backend, site)
+    result = ImportResult()
+    try:
+        with ProcessPoolExecutor(workers) if workers > 1 else _InlineExecutor() as pool:
+            pending = []
+            first = 1
+            chunks = read_chunks(path, fmt, chunk_size)
+            while True:
+                # Chunks are validated in parallel but written in input order;
+                # at most two per worker are in flight.
+                for chunk in chunks:
+                    pending.append(pool.submit(validate_chunk, chunk, first, google_form))
+                    first += len(chunk)
+                    result.read += len(chunk)
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                valid, fingerprints, errors = pending.pop(0).result()
+                result.invalid += len(errors)
+                result.errors.extend(errors[:MAX_ERRORS - len(result.errors)])
+                rows = []
+                for row, key in zip(valid, fingerprints):
+                    if key in seen:
+                        result.duplicates += 1
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+                if rows and writer is not None:
+                    writer.write_rows(rows)
+                result.imported += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export and import of visitor responses")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="file to write (export) or read (import)")
+    parser.add_argument("--storage", choices=("csv", "parquet", "sqlite"), help="backend to read from / write to")
+    parser.add_argument("--site")
+    parser.add_argument("--format", choices=FORMATS, help="instead of guessing from the file name")
+    parser.add_argument("--from", dest="start", help="export: first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="export: last date, YYYY-MM-DD")
+    parser.add_argument("--lang", choices=LANGUAGES, help="export: only responses in this language")
+    parser.add_argument("--compression", default="zstd", help="export: Parquet codec (zstd, snappy, gzip, none)")
+    parser.add_argument("--google-form", help="import: a Google Form response export of this form variant, e.g. trial")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="import: validate and count only")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        exported = export(args.path, args.storage, args.site, args.start, args.end, args.lang, args.format,
+                          args.compression)
+        print(f"Exported {exported} responses to {args.path} in {time.perf_counter() - start:.1f}s")
+        return
+    result = import_rows(args.path, args.storage, args.site, args.format, args.google_form, args.workers,
+                         args.chunk_size, args.dry_run)
+    print(f"{'Checked' if args.dry_run else 'Imported'} {result.imported} of {result.read} rows in "
+          f"{time.perf_counter() - start:.1f}s ({result.duplicates} duplicates, {result.invalid} invalid)")
+    for number, error in result.errors:
+        print(f"  row {number}: {error}")
+    if result.invalid > len(result.errors):
+        print(f"  ... and {result.invalid - len(result.errors)} more")
+    if result.invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+import metrics
+from storage import fsync_directory, open_storage, row_key, storage_backend
+
+# Crash-safe submit path. Each response is appended to an append-only log as
+# a framed record (length, CRC32, JSON payload) and the submitting session
+# waits until it is on disk. Concurrent submits share one write and one
+# fsync (group commit). A background compactor copies committed records into
+# the configured storage backend and checkpoints how far it got.
+#
+# After a power loss the log ends in at most one torn record, which fails its
+# length or checksum test and is truncated on the next start; compaction then
+# resumes from the checkpoint. The checkpoint only moves once the backend has
+# synced the compacted rows and records where the backend ended; records
+# compacted just before a crash, but not yet checkpointed, are found past
+# that position and not written again, and a CSV row torn by the crash is
+# cut off (exactly-once).
+
+WAL_NAME = "visitor_data.wal"
+HEADER = struct.Struct("<II")
+GROUP_WINDOW = 0.0
+COMPACT_INTERVAL = 5.0
+COMPACT_BATCH = 500
+# The log is emptied once everything in it is compacted and it is this big.
+TRUNCATE_AFTER = 1024 * 1024
+
+
+def frame(row):
+    payload = json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+# Yields (end offset, row) for every intact record from `offset`, stopping at
+# the first incomplete or corrupt one.
+def read_records(f, offset=0):
+    f.seek(offset)
+    while True:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        length, checksum = HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        offset += HEADER.size + length
+        yield offset, json.loads(payload)
+
+
+class WriteAheadLog:
+    def __init__(self, path, group_window=GROUP_WINDOW):
+        self.path = path
+        self.group_window = group_window
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        created = not os.path.exists(path)
+        self.file = open(path, "a+b")
+        if created:
+            fsync_directory(path)
+        self.size = self.recover()
+        self.cond = threading.Condition()
+        self.pending = []
+        self.next_seq = 0
+        # Sequence numbers up to done_seq are committed, or listed in failed.
+        self.done_seq = 0
+        self.failed = {}
+        self.torn = False
+        self.closed = False
+        self.committer = threading.Thread(target=self._commit_loop, name="wal-commit", daemon=True)
+        self.committer.start()
+
+    # Drops a torn or corrupt tail left by a crash; returns the intact size.
+    def recover(self):
+        end = 0
+        for end, _ in read_records(self.file):
+            pass
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() != end:
+            metrics.count("wal_truncated_bytes_total", self.file.tell() - end)
+            self.file.truncate(end)
+            os.fsync(self.file.fileno())
+        return end
+
+    # Returns once the row is durable on disk; raises the OSError if its
+    # commit failed.
+    def append(self, row):
+        record = frame(row)
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("write-ahead log is closed")
+            self.pending.append(record)
+            self.next_seq += 1
+            seq = self.next_seq
+            self.cond.notify_all()
+            while self.done_seq < seq:
+                self.cond.wait()
+            error = self.failed.pop(seq, None)
+            if error is not None:
+                raise error
+
+    def _commit_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+            # Records arriving while the previous fsync ran are already
+            # pending; a window makes sessions wait a little to join too.
+            if self.group_window:
+                time.sleep(self.group_window)
+            with self.cond:
+                batch, self.pending = self.pending, []
+                seq = self.next_seq
+            start = time.perf_counter()
+            try:
+                if self.torn:
+                    self._rewind()
+                data = b"".join(batch)
+                self.file.write(data)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                # Only this batch fails; the next one is tried afresh, so
+                # the kiosk recovers with the disk.
+                print(f"wal: commit failed: {e!r}", file=sys.stderr)
+                metrics.count("wal_commit_errors_total")
+                self.torn = True
+                try:
+                    self._rewind()
+                except OSError:
+                    pass
+                with self.cond:
+                    for failed in range(self.done_seq + 1, seq + 1):
+                        self.failed[failed] = e
+                    self.done_seq = seq
+                    self.cond.notify_all()
+                continue
+            metrics.observe("wal_commit_seconds", time.perf_counter() - start)
+            metrics.count("wal_fsyncs_total")
+            metrics.count("wal_records_total", len(batch))
+            with self.cond:
+                self.size += len(data)
+                self.done_seq = seq
+                self.cond.notify_all()
+
+    # Cuts what a failed batch left in the log back off. The file object is
+    # replaced, since its buffer may still hold part of the batch.
+    def _rewind(self):
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        self.file = open(self.path, "a+b")
+        self.file.truncate(self.size)
+        os.fsync(self.file.fileno())
+        self.torn = False
+
+    # Runs fn() while no commit is in flight and nothing is pending.
+    def quiesced(self, fn):
+        with self.cond:
+            while self.pending or self.done_seq < self.next_seq:
+                self.cond.wait()
+            return fn()
+
+    def reset(self):
+        self.file.truncate(0)
+        os.fsync(self.file.fileno())
+        self.size = 0
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.committer.join()
+        self.file.close()
+
+
+class Compactor(threading.Thread):
+    def __init__(self, log, sink, interval=COMPACT_INTERVAL, batch=COMPACT_BATCH):
+        super().__init__(name="wal-compactor", daemon=True)
+        self.log = log
+        self.sink = sink
+        self.interval = interval
+        self.batch = batch
+        self.checkpoint_path = log.path + ".checkpoint"
+        self.offset, self.position = self.load_checkpoint()
+        # Set while a batch may be partly in the sink but not checkpointed:
+        # from the start (a crash may have left one) and while writing.
+        self.dirty = True
+        self.skip = Counter()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    # (log offset, sink position); older checkpoints hold just the offset.
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.loads(f.read().strip() or "0")
+        except FileNotFoundError:
+            return 0, None
+        if isinstance(state, int):
+            state = {"offset": state}
+        # The log was emptied after the checkpoint was written.
+        return (state["offset"] if state["offset"] <= self.log.size else 0), state.get("position")
+
+    def save_checkpoint(self, offset, position=None):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "position": position}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self.offset = offset
+        self.position = position
+
+    # A crash or error in the middle of a compaction can leave the next batch
+    # partly in the sink: cut off a torn last row, and skip the rows that
+    # did get stored past the checkpointed position when the batch is
+    # written again, so each record is stored exactly once.
+    def recover(self):
+        with open(self.log.path, "rb") as f:
+            rows = []
+            for end, row in read_records(f, self.offset):
+                if end > self.log.size or len(rows) >= self.batch:
+                    break
+                rows.append(row)
+        self.skip = Counter()
+        if rows:
+            dropped = self.sink.repair(rows, self.position)
+            if dropped:
+                metrics.count("wal_sink_repaired_bytes_total", dropped)
+            pending = Counter(row_key(row) for row in rows)
+            self.skip = self.sink.stored_after(rows, self.position) & pending
+            if self.skip:
+                metrics.count("wal_recovered_rows_total", sum(self.skip.values()))
+        self.dirty = False
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.compact()
+            except Exception as e:
+                # Retried on the next interval; the log keeps every record.
+                print(f"wal: compaction failed: {e!r}", file=sys.stderr)
+                metrics.count("wal_compact_errors_total")
+
+    # Copies committed records past the checkpoint into the sink; returns
+    # the number of rows written.
+    def compact(self):
+        with self.lock:
+            if self.dirty:
+                self.recover()
+            compacted = 0
+            with open(self.log.path, "rb") as f:
+                rows = []
+                last = self.offset
+                limit = self.log.size
+                for end, row in read_records(f, self.offset):
+                    if end > limit:
+                        break
+                    last = end
+                    if self.skip and self.skip[row_key(row)] > 0:
+                        self.skip[row_key(row)] -= 1
+                        continue
+                    rows.append(row)
+                    if len(rows) >= self.batch:
+                        compacted += self._write(rows, last)
+                        rows = []
+                if last != self.offset:
+                    compacted += self._write(rows, last)
+                self.skip = Counter()
+            if self.offset >= TRUNCATE_AFTER:
+                self.log.quiesced(self._truncate_if_compacted)
+            return compacted
+
+    # The sink is durable (see LoggedStorage), so the rows are on disk before
+    # the checkpoint moves past them.
+    def _write(self, rows, end):
+        if not rows:
+            self.save_checkpoint(end, self.position)
+            return 0
+        self.dirty = True
+        with metrics.timed("wal_compact_seconds"):
+            self.sink.write_rows(rows)
+        self.save_checkpoint(end, self.sink.position(rows))
+        self.dirty = False
+        self.sink.notify(rows)
+        return len(rows)
+
+    def _truncate_if_compacted(self):
+        if self.offset == self.log.size:
+            self.log.reset()
+            self.save_checkpoint(0, self.position)
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+        self.compact()
+
+
+def wal_path(site=None):
+    if site is None:
+        return WAL_NAME
+    from sites import site_config, site_dir
+
+    site_config(site)
+    return os.path.join(site_dir(site), WAL_NAME)
+
+
+class LoggedStorage:
+    def __init__(self, backend=None, site=None, interval=COMPACT_INTERVAL):
+        self.log = WriteAheadLog(wal_path(site))
+        # The backend's writer, used without its buffer.
+        self.sink = open_storage(backend or storage_backend(), site)
+        self.sink.make_durable()
+        self.listeners = self.sink.listeners
+        self.compactor = Compactor(self.log, self.sink, interval)
+        self.compactor.compact()
+        self.compactor.start()
+        atexit.register(self.close)
+
+    def append(self, row):
+        self.log.append(row)
+
+    def flush(self):
+        self.compactor.compact()
+
+    def close(self):
+        if self.log.closed:
+            return
+        self.compactor.stop()
+        self.log.close()
+        self.sink.close()
+
+
+def open_logged_storage(backend=None, site=None):
+    return LoggedStorage(backend, site)